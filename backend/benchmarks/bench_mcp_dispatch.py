@@ -0,0 +1,113 @@
+"""
+Benchmark de latencia por llamada a herramienta MCP: camino HTTP interno de fastapi-mcp
+frente al despacho directo de backend/mcp_dispatch.py.
+
+Uso (desde la raíz del proyecto):
+    python -m backend.benchmarks.bench_mcp_dispatch                      # contra la BD configurada en .env
+    python -m backend.benchmarks.bench_mcp_dispatch --demo-rows 5000     # sin BD, con un snapshot sintético
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compara la latencia por llamada de herramienta MCP (HTTP interno vs. despacho directo)")
+    parser.add_argument("--iteraciones", type=int, default=200, help="Llamadas por herramienta y modo")
+    parser.add_argument("--componente-id", type=int, default=1, help="ID usado por obtener_detalles_componente_por_id")
+    parser.add_argument("--query", default="RTX", help="Término usado por buscar_componente_por_nombre")
+    parser.add_argument("--demo-rows", type=int, default=0,
+                        help="Si es > 0, publica un snapshot sintético con ese número de filas y no usa la BD")
+    return parser.parse_args()
+
+
+def publish_demo_snapshot(n_rows: int):
+    from backend.db import catalog_snapshot
+
+    rng = random.Random(42)
+    tipos = ["GPU", "CPU", "RAM", "Motherboard", "PSU"]
+    tiendas = ["Amazon", "Mercado Libre", "Cyberpuerta", "DDTech"]
+    sockets = ["AM4", "AM5", "LGA1700", None]
+    componentes = [
+        {
+            "id": i,
+            "tipo": rng.choice(tipos),
+            "modelo": f"Modelo demo {i}",
+            "precio": round(rng.uniform(500, 40000), 2),
+            "tienda": rng.choice(tiendas),
+            "url": f"https://example.com/p/{i}",
+            "consumo": rng.choice([None, 65, 105, 170, 320, 450]),
+            "socket": rng.choice(sockets),
+            "rams": None,
+            "potencia": None,
+            "img": None,
+        }
+        for i in range(1, n_rows + 1)
+    ]
+    catalog_snapshot.publish_snapshot(componentes)
+
+
+async def medir(mcp, tool_name, arguments, iteraciones):
+    # Calentamiento (primera carga de estadísticas, remapeo del snapshot, etc.)
+    await mcp._execute_api_tool(mcp._http_client, tool_name, arguments, mcp.operation_map)
+    tiempos = []
+    for _ in range(iteraciones):
+        inicio = time.perf_counter()
+        await mcp._execute_api_tool(mcp._http_client, tool_name, arguments, mcp.operation_map)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {
+        "media": statistics.fmean(tiempos),
+        "p50": tiempos[len(tiempos) // 2],
+        "p95": tiempos[int(len(tiempos) * 0.95) - 1],
+    }
+
+
+async def main():
+    args = parse_args()
+    if args.demo_rows > 0:
+        # Las banderas se leen al importar los módulos del backend, por eso se fijan antes
+        os.environ["CATALOG_SNAPSHOT"] = "1"
+        os.environ["CATALOG_SNAPSHOT_DIR"] = tempfile.mkdtemp(prefix="pcparts_bench_")
+        publish_demo_snapshot(args.demo_rows)
+
+    from fastapi import FastAPI
+    from backend.routes import componentes_routes
+    from backend.mcp_dispatch import DirectDispatchMCP
+
+    app = FastAPI()
+    app.include_router(componentes_routes.router)
+    # Ambos modos pasan por el control de admisión; solo cambia el camino de ejecución
+    modos = {"http": DirectDispatchMCP(app, direct=False), "directo": DirectDispatchMCP(app)}
+
+    herramientas = [
+        ("obtener_detalles_componente_por_id", {"componente_id": args.componente_id}),
+        ("listar_todos_los_componentes", {}),
+        ("estadisticas_componentes", {"agrupar_por": "tienda", "campo": "precio", "percentiles": [50, 90]}),
+    ]
+    if args.demo_rows == 0:
+        # La búsqueda siempre va a la BD
+        herramientas.append(("buscar_componente_por_nombre", {"query": args.query}))
+
+    print(f"{'herramienta':<38}{'modo':<10}{'media ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for tool_name, arguments in herramientas:
+        resultados = {}
+        for modo, mcp in modos.items():
+            try:
+                resultados[modo] = await medir(mcp, tool_name, arguments, args.iteraciones)
+            except Exception as e:
+                print(f"{tool_name:<38}{modo:<10} error: {e}")
+                continue
+            r = resultados[modo]
+            print(f"{tool_name:<38}{modo:<10}{r['media']:>10.3f}{r['p50']:>10.3f}{r['p95']:>10.3f}")
+        if len(resultados) == 2:
+            print(f"{'':<38}{'speedup':<10}{resultados['http']['media'] / resultados['directo']['media']:>10.2f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,95 @@
+import json
+import asyncio
+import decimal
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
+
+# Coalescencia de lecturas idénticas concurrentes: cuando varias peticiones piden la misma
+# consulta con los mismos parámetros mientras una ya está en vuelo, todas esperan a esa única
+# ejecución en la BD y comparten el resultado (y su serialización JSON, que se hace una vez).
+#
+# Las escrituras actúan como barrera: cada una avanza la "generación" al empezar y al terminar,
+# y la generación forma parte de la clave. Así, una lectura que llega durante o después de una
+# escritura nunca se une a una ejecución que empezó antes y podría devolver datos obsoletos.
+
+
+def json_default(value):
+    # Tipos que devuelve mysql.connector y que json no sabe serializar (DECIMAL, fechas...)
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return jsonable_encoder(value)
+
+
+class CoalescedResult:
+    """Resultado compartido de una consulta: el valor y su JSON, serializado una sola vez."""
+
+    def __init__(self, value: Any):
+        self.value = value
+        self._body = None
+
+    @property
+    def body(self) -> bytes:
+        if self._body is None:
+            self._body = json.dumps(self.value, ensure_ascii=False, default=json_default).encode("utf-8")
+        return self._body
+
+
+class QueryCoalescer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._inflight: Dict[Tuple[Hashable, ...], asyncio.Task] = {}
+        self.counters = {
+            "ejecutadas": 0,
+            "coalescidas": 0,
+            "barreras_escritura": 0,
+        }
+
+    async def run(self, nombre: str, params: Tuple[Hashable, ...], fn: Callable[[], Any]) -> CoalescedResult:
+        """Ejecuta `fn` en el threadpool, o se une a una ejecución idéntica ya en vuelo."""
+        key = (nombre, params, self._generation)
+        task = self._inflight.get(key)
+        if task is not None:
+            self.counters["coalescidas"] += 1
+        else:
+            # La ejecución compartida va en su propia tarea: si se cancela quien la lanzó (p. ej. el
+            # cliente se desconecta), las demás peticiones unidas a ella siguen esperando su resultado
+            task = asyncio.ensure_future(self._execute(fn))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finished(key, t))
+            self.counters["ejecutadas"] += 1
+        # shield: cancelar a este llamante no cancela la tarea compartida
+        return await asyncio.shield(task)
+
+    @staticmethod
+    async def _execute(fn: Callable[[], Any]) -> CoalescedResult:
+        return CoalescedResult(await run_in_threadpool(fn))
+
+    def _finished(self, key: Tuple[Hashable, ...], task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # marcada como recuperada aunque nadie la espere ya
+
+    @contextmanager
+    def write_barrier(self):
+        """Envuelve una escritura para que ninguna lectura posterior reciba un resultado anterior."""
+        with self._lock:
+            self._generation += 1
+            self.counters["barreras_escritura"] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._generation += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        # `coalescidas` = consultas a la BD ahorradas
+        return {**self.counters, "en_vuelo": len(self._inflight)}
+
+
+coalescer = QueryCoalescer()
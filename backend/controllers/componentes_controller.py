@@ -1,16 +1,26 @@
 from fastapi import HTTPException
 from mysql.connector import Error
 from typing import List, Dict, Any
-
-# Nota: La conexión a la BD (conn) se pasará como argumento a estas funciones
+from backend.db.statements import (
+    SQL_SELECT_ALL,
+    SQL_SELECT_BY_ID,
+    SQL_SEARCH_BY_MODELO,
+    SQL_DELETE_BY_ID,
+    update_sql,
+    insert_sql,
+    prepared_cursor,
+)
+
+# Nota: La conexión a la BD (conn) se pasará como argumento a estas funciones.
+# Las consultas usan sentencias preparadas cacheadas por conexión (ver backend/db/statements.py),
+# por eso los cursores no se cierran aquí y los resultados se leen siempre completos (fetchall).
 
 def get_all_componentes_logic(conn):
     """Lógica para obtener todos los componentes."""
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT id, tipo, modelo, precio, tienda, url, consumo, socket, rams, potencia, img FROM componentes")
+        cursor = prepared_cursor(conn, SQL_SELECT_ALL)
+        cursor.execute(SQL_SELECT_ALL)
         componentes = cursor.fetchall()
-        cursor.close()
         if not componentes:
             return []
         return componentes
@@ -21,28 +31,49 @@ def get_all_componentes_logic(conn):
 def get_componente_by_id_logic(conn, componente_id: int):
     """Lógica para obtener un componente por su ID."""
     try:
-        cursor = conn.cursor(dictionary=True)
-        query = "SELECT id, tipo, modelo, precio, tienda, url, consumo, socket, rams, potencia, img FROM componentes WHERE id = %s"
-        cursor.execute(query, (componente_id,))
-        componente = cursor.fetchone()
-        cursor.close()
-        if componente is None:
+        cursor = prepared_cursor(conn, SQL_SELECT_BY_ID)
+        cursor.execute(SQL_SELECT_BY_ID, (componente_id,))
+        filas = cursor.fetchall()
+        if not filas:
             raise HTTPException(status_code=404, detail="Componente no encontrado")
-        return componente
+        return filas[0]
     except Error as e:
         print(f"Error en el controlador al consultar componente {componente_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Error interno del servidor al consultar el dato: {e}")
 
+def get_all_componentes_snapshot_logic(snapshot, indent=None, as_text=False):
+    """Lógica para obtener todos los componentes desde el snapshot, ya serializados en JSON (bytes o str)."""
+    return snapshot.json_text(indent) if as_text else snapshot.json_body(indent)
+
+def get_componente_by_id_snapshot_logic(snapshot, componente_id: int):
+    """Lógica para obtener un componente por su ID desde el snapshot mapeado en memoria."""
+    componente = snapshot.get(componente_id)
+    if componente is None:
+        raise HTTPException(status_code=404, detail="Componente no encontrado")
+    return componente
+
+def get_componentes_stats_logic(store, agrupar_por: str, campo: str, percentiles: List[float], filtros: Dict[str, str]):
+    """Lógica para calcular estadísticas de un campo numérico agrupadas por tipo, tienda o socket."""
+    # `not 0 <= q <= 100` también rechaza NaN (cualquier comparación con NaN es falsa)
+    if any(not 0 <= q <= 100 for q in percentiles):
+        raise HTTPException(status_code=400, detail="Los percentiles deben estar entre 0 y 100.")
+    grupos = store.group_stats(agrupar_por, campo, percentiles, filtros)
+    return {
+        "agrupar_por": agrupar_por,
+        "campo": campo,
+        "filtros": filtros,
+        "total": sum(g["count"] for g in grupos),
+        "grupos": grupos,
+    }
+
 def search_componentes_by_name_logic(conn, nombre: str):
     """Lógica para buscar componentes por nombre (modelo)."""
     try:
-        cursor = conn.cursor(dictionary=True)
+        cursor = prepared_cursor(conn, SQL_SEARCH_BY_MODELO)
         # Usamos LIKE para búsquedas parciales, el comodín % debe ser añadido al valor
-        query = "SELECT id, tipo, modelo, precio, tienda, url, consumo, socket, rams, potencia, img FROM componentes WHERE modelo LIKE %s"
         search_term = f"%{nombre}%"
-        cursor.execute(query, (search_term,))
+        cursor.execute(SQL_SEARCH_BY_MODELO, (search_term,))
         componentes = cursor.fetchall()
-        cursor.close()
         # Es normal que una búsqueda no devuelva resultados, así que no lanzamos 404 aquí.
         # La API puede devolver una lista vacía.
         return componentes
@@ -58,42 +89,42 @@ def update_componente_logic(conn, componente_id: int, componente_data: Dict[str,
     if not fields_to_update:
         raise HTTPException(status_code=400, detail="No hay datos para actualizar.")
 
-    set_clause = ", ".join([f"{key} = %s" for key in fields_to_update.keys()])
-    values = list(fields_to_update.values())
+    # El SQL sale de la lista blanca de columnas, nunca de las claves recibidas
+    try:
+        query, columnas = update_sql(fields_to_update.keys())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    values = [fields_to_update[c] for c in columnas]
     values.append(componente_id)
 
-    query = f"UPDATE componentes SET {set_clause} WHERE id = %s"
-
     try:
-        cursor = conn.cursor()
+        cursor = prepared_cursor(conn, query)
         cursor.execute(query, tuple(values))
         conn.commit() # Importante para guardar los cambios
 
         if cursor.rowcount == 0:
-            cursor.close()
             raise HTTPException(status_code=404, detail="Componente no encontrado para actualizar.")
-        
-        cursor.close()
+
         # Devolver el componente actualizado
         return get_componente_by_id_logic(conn, componente_id)
     except Error as e:
         conn.rollback() # Revertir cambios en caso de error
         print(f"Error en el controlador al actualizar componente {componente_id}: {e}")
+        # La clave natural (modelo, tienda) es UNIQUE: cambiar uno de los dos puede chocar con otro componente
+        if e.errno == 1062:
+             raise HTTPException(status_code=409, detail=f"Error al actualizar componente: Entrada duplicada. {e.msg}")
         raise HTTPException(status_code=500, detail=f"Error interno del servidor al actualizar el dato: {e}")
 
 def delete_componente_logic(conn, componente_id: int):
     """Lógica para eliminar un componente por su ID."""
     try:
-        cursor = conn.cursor()
-        query = "DELETE FROM componentes WHERE id = %s"
-        cursor.execute(query, (componente_id,))
+        cursor = prepared_cursor(conn, SQL_DELETE_BY_ID)
+        cursor.execute(SQL_DELETE_BY_ID, (componente_id,))
         conn.commit() # Importante para guardar los cambios
 
         if cursor.rowcount == 0:
-            cursor.close()
             raise HTTPException(status_code=404, detail="Componente no encontrado para eliminar.")
-        
-        cursor.close()
+
         return {"message": "Componente eliminado exitosamente", "id_eliminado": componente_id}
     except Error as e:
         conn.rollback() # Revertir cambios en caso de error
@@ -107,18 +138,18 @@ def create_componente_logic(conn, componente_data: Dict[str, Any]):
     # Esto dependerá de cómo el modelo Pydantic maneje la conversión.
     # Por ahora, asumimos que componente_data ya tiene los tipos correctos del modelo Pydantic.
 
-    column_names = ", ".join(componente_data.keys())
-    value_placeholders = ", ".join(["%s"] * len(componente_data))
-    values = tuple(componente_data.values())
-
-    query = f"INSERT INTO componentes ({column_names}) VALUES ({value_placeholders})"
+    # El SQL sale de la lista blanca de columnas, nunca de las claves recibidas
+    try:
+        query, columnas = insert_sql(componente_data.keys())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    values = tuple(componente_data[c] for c in columnas)
 
     try:
-        cursor = conn.cursor()
+        cursor = prepared_cursor(conn, query)
         cursor.execute(query, values)
         new_componente_id = cursor.lastrowid # Obtener el ID del componente recién insertado
         conn.commit()
-        cursor.close()
 
         if new_componente_id:
             # Devolver el componente recién creado
@@ -0,0 +1,358 @@
+import os
+import json
+import mmap
+import math
+import time
+import struct
+import bisect
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Snapshot columnar de solo lectura de la tabla `componentes`, pensado para compartirse
+# entre varios workers de uvicorn a través de un archivo mapeado en memoria (mmap).
+#
+# Distribución del archivo (little-endian, cada sección alineada a 8 bytes):
+#   cabecera  : magic, versión de formato, nº de columnas de texto, nº de filas, tamaño del arena,
+#               tamaño de los diccionarios
+#   id        : int64[n]   (ordenado de forma ascendente para búsqueda binaria)
+#   precio    : float64[n] (NaN = NULL)
+#   consumo   : int64[n]   (-1 = NULL)
+#   potencia  : int64[n]   (-1 = NULL)
+#   offsets   : int64[n * T + 1]  la celda (fila i, columna j) ocupa arena[offsets[i*T+j]:offsets[i*T+j+1]]
+#   nulos     : uint8[n * T]      1 si la celda de texto es NULL
+#   códigos   : int32[n] por cada columna de COLUMNAS_DICCIONARIO (índice en su diccionario)
+#   arena     : bytes UTF-8 concatenados de todas las celdas de texto
+#   dicts     : JSON {columna: [valores distintos]} de las columnas codificadas (null = NULL)
+#
+# Las columnas de agrupación van además codificadas como diccionario para que las estadísticas
+# (backend/db/catalog_stats.py) se carguen con np.frombuffer sin decodificar fila a fila.
+#
+# Cada versión se escribe en su propio archivo (`componentes.<version>.snap`) y se publica
+# reemplazando de forma atómica el puntero `componentes.current`. Los lectores detectan el
+# cambio de puntero y remapean; los mapas antiguos siguen siendo válidos mientras se usen.
+
+SNAPSHOT_ENABLED = os.getenv('CATALOG_SNAPSHOT', '0').lower() in ('1', 'true', 'yes', 'si')
+SNAPSHOT_DIR = os.getenv('CATALOG_SNAPSHOT_DIR', os.path.join(tempfile.gettempdir(), 'pcparts_snapshot'))
+
+_MAGIC = b'PCSNAP01'
+_FORMAT_VERSION = 2
+_HEADER = struct.Struct('<8sIIQQQ')
+_HEADER_SIZE = 64
+_NULL_INT = -1
+
+_POINTER_NAME = 'componentes.current'
+_LOCK_NAME = 'componentes.lock'
+
+COLUMNAS_NUMERICAS = ('precio', 'consumo', 'potencia')
+COLUMNAS_TEXTO = ('tipo', 'modelo', 'tienda', 'url', 'socket', 'rams', 'img')
+COLUMNAS_DICCIONARIO = ('tipo', 'tienda', 'socket')
+# Mismo orden de columnas que devuelven las consultas del controlador
+COLUMNAS = ('id', 'tipo', 'modelo', 'precio', 'tienda', 'url', 'consumo', 'socket', 'rams', 'potencia', 'img')
+
+
+def _align8(n: int) -> int:
+    return (n + 7) & ~7
+
+
+class CatalogSnapshot:
+    """Vista de solo lectura (zero-copy) sobre un archivo de snapshot mapeado en memoria."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.nombre = os.path.basename(path)
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+
+        magic, format_version, n_text, n_rows, arena_size, dicts_size = _HEADER.unpack_from(buf, 0)
+        if magic != _MAGIC or format_version != _FORMAT_VERSION or n_text != len(COLUMNAS_TEXTO):
+            raise ValueError(f"Snapshot con formato no reconocido: {path}")
+
+        self.row_count = n_rows
+        offset = _HEADER_SIZE
+
+        def take(fmt: str, count: int, itemsize: int):
+            nonlocal offset
+            view = buf[offset:offset + count * itemsize].cast(fmt)
+            offset = _align8(offset + count * itemsize)
+            return view
+
+        self.ids = take('q', n_rows, 8)
+        self.precio = take('d', n_rows, 8)
+        self.consumo = take('q', n_rows, 8)
+        self.potencia = take('q', n_rows, 8)
+        self._text_offsets = take('q', n_rows * n_text + 1, 8)
+        self._text_nulls = take('B', n_rows * n_text, 1)
+        # Códigos de diccionario por columna de agrupación y los valores distintos de cada una
+        self.codigos = {c: take('i', n_rows, 4) for c in COLUMNAS_DICCIONARIO}
+        self._arena = buf[offset:offset + arena_size]
+        # JSON del listado completo, generado una sola vez por versión (y formato) del snapshot
+        self._json_cache: Dict[Any, Any] = {}
+        self._json_lock = threading.Lock()
+        offset += arena_size
+        self.diccionarios: Dict[str, List[Optional[str]]] = json.loads(bytes(buf[offset:offset + dicts_size]))
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def text(self, row: int, column: int) -> Optional[str]:
+        cell = row * len(COLUMNAS_TEXTO) + column
+        if self._text_nulls[cell]:
+            return None
+        return str(self._arena[self._text_offsets[cell]:self._text_offsets[cell + 1]], 'utf-8')
+
+    def row(self, row: int) -> Dict[str, Any]:
+        precio = self.precio[row]
+        consumo = self.consumo[row]
+        potencia = self.potencia[row]
+        textos = [self.text(row, j) for j in range(len(COLUMNAS_TEXTO))]
+        return {
+            'id': self.ids[row],
+            'tipo': textos[0],
+            'modelo': textos[1],
+            'precio': None if math.isnan(precio) else precio,
+            'tienda': textos[2],
+            'url': textos[3],
+            'consumo': None if consumo == _NULL_INT else consumo,
+            'socket': textos[4],
+            'rams': textos[5],
+            'potencia': None if potencia == _NULL_INT else potencia,
+            'img': textos[6],
+        }
+
+    def find_row(self, componente_id: int) -> Optional[int]:
+        """Devuelve el índice de fila del componente o None (búsqueda binaria sobre `id`)."""
+        i = bisect.bisect_left(self.ids, componente_id)
+        if i < self.row_count and self.ids[i] == componente_id:
+            return i
+        return None
+
+    def get(self, componente_id: int) -> Optional[Dict[str, Any]]:
+        i = self.find_row(componente_id)
+        return None if i is None else self.row(i)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        return [self.row(i) for i in range(self.row_count)]
+
+    def json_body(self, indent: Optional[int] = None) -> bytes:
+        """Listado completo en JSON (UTF-8). Decodificar todas las filas es caro, así que se hace
+        una vez por versión y los listados siguientes devuelven los mismos bytes."""
+        body = self._json_cache.get(indent)
+        if body is None:
+            with self._json_lock:
+                body = self._json_cache.get(indent)
+                if body is None:
+                    body = json.dumps(self.rows(), ensure_ascii=False, indent=indent).encode('utf-8')
+                    self._json_cache[indent] = body
+        return body
+
+    def json_text(self, indent: Optional[int] = None) -> str:
+        """Igual que json_body() pero como str (lo que necesitan las respuestas de herramientas MCP)."""
+        text = self._json_cache.get(('str', indent))
+        if text is None:
+            text = self._json_cache.setdefault(('str', indent), self.json_body(indent).decode('utf-8'))
+        return text
+
+
+def write_snapshot(path: str, componentes: List[Dict[str, Any]]) -> None:
+    """Serializa los componentes al formato columnar y escribe el archivo en `path`."""
+    componentes = sorted(componentes, key=lambda c: c['id'])
+    n_rows = len(componentes)
+    n_text = len(COLUMNAS_TEXTO)
+
+    ids = [int(c['id']) for c in componentes]
+    precios = [math.nan if c.get('precio') is None else float(c['precio']) for c in componentes]
+    consumos = [_NULL_INT if c.get('consumo') is None else int(c['consumo']) for c in componentes]
+    potencias = [_NULL_INT if c.get('potencia') is None else int(c['potencia']) for c in componentes]
+
+    arena = bytearray()
+    offsets = [0]
+    nulls = bytearray(n_rows * n_text)
+    for i, c in enumerate(componentes):
+        for j, columna in enumerate(COLUMNAS_TEXTO):
+            valor = c.get(columna)
+            if valor is None:
+                nulls[i * n_text + j] = 1
+            else:
+                arena += str(valor).encode('utf-8')
+            offsets.append(len(arena))
+
+    diccionarios = {c: {} for c in COLUMNAS_DICCIONARIO}
+    codigos = {
+        c: [diccionarios[c].setdefault(None if comp.get(c) is None else str(comp[c]), len(diccionarios[c])) for comp in componentes]
+        for c in COLUMNAS_DICCIONARIO
+    }
+    dicts_json = json.dumps({c: list(d) for c, d in diccionarios.items()}, ensure_ascii=False).encode('utf-8')
+
+    def pad(f):
+        f.write(b'\0' * (_align8(f.tell()) - f.tell()))
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, n_text, n_rows, len(arena), len(dicts_json)))
+        f.write(b'\0' * (_HEADER_SIZE - _HEADER.size))
+        f.write(struct.pack(f'<{n_rows}q', *ids))
+        f.write(struct.pack(f'<{n_rows}d', *precios))
+        f.write(struct.pack(f'<{n_rows}q', *consumos))
+        f.write(struct.pack(f'<{n_rows}q', *potencias))
+        f.write(struct.pack(f'<{len(offsets)}q', *offsets))
+        f.write(nulls)
+        pad(f)
+        for c in COLUMNAS_DICCIONARIO:
+            f.write(struct.pack(f'<{n_rows}i', *codigos[c]))
+            pad(f)
+        f.write(arena)
+        f.write(dicts_json)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _pointer_path() -> str:
+    return os.path.join(SNAPSHOT_DIR, _POINTER_NAME)
+
+
+def publish_snapshot(componentes: List[Dict[str, Any]]) -> str:
+    """Escribe una nueva versión del snapshot y la publica con un reemplazo atómico del puntero."""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    version = f"{time.time_ns()}-{os.getpid()}"
+    nombre = f"componentes.{version}.snap"
+    destino = os.path.join(SNAPSHOT_DIR, nombre)
+
+    write_snapshot(destino + '.tmp', componentes)
+    os.replace(destino + '.tmp', destino)
+
+    puntero_tmp = f"{_pointer_path()}.{os.getpid()}.tmp"
+    with open(puntero_tmp, 'w', encoding='utf-8') as f:
+        f.write(nombre)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(puntero_tmp, _pointer_path())
+
+    _cleanup_old_versions(keep=nombre)
+    return version
+
+
+def _cleanup_old_versions(keep: str) -> None:
+    # En POSIX los workers que aún tengan mapeada una versión antigua la siguen viendo tras el unlink.
+    # En Windows el borrado falla mientras esté mapeada; se reintentará en la siguiente publicación.
+    for nombre in os.listdir(SNAPSHOT_DIR):
+        if nombre.endswith('.snap') and nombre != keep:
+            try:
+                os.remove(os.path.join(SNAPSHOT_DIR, nombre))
+            except OSError:
+                pass
+
+
+@contextmanager
+def _publish_lock():
+    """Serializa las publicaciones entre procesos para que una lectura antigua no pise a una más nueva.
+
+    Es un lock del sistema operativo sobre el archivo (no su mera existencia), así que se libera
+    solo si el proceso que lo tiene muere y nunca se le quita a quien sigue publicando.
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with open(os.path.join(SNAPSHOT_DIR, _LOCK_NAME), 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK reintenta durante ~10 s y luego lanza OSError; se sigue esperando
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _read_pointer() -> Optional[str]:
+    try:
+        with open(_pointer_path(), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def build_snapshot_from_db(conn) -> Tuple[Optional[str], str]:
+    """Lee la tabla `componentes` completa y publica una nueva versión del snapshot.
+
+    Devuelve (archivo vigente justo antes de publicar, archivo publicado). Como se lee bajo el lock,
+    si el llamante tenía mapeado el primero, la única diferencia entre ambos es su propia escritura.
+    """
+    with _publish_lock():
+        anterior = _read_pointer()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"SELECT {', '.join(COLUMNAS)} FROM componentes ORDER BY id")
+        componentes = cursor.fetchall()
+        cursor.close()
+        version = publish_snapshot(componentes)
+    print(f"Snapshot del catálogo publicado: versión {version} ({len(componentes)} componentes)")
+    return anterior, f"componentes.{version}.snap"
+
+
+# Estado por proceso: snapshot mapeado actualmente y la identidad del puntero del que salió
+_current: Optional[CatalogSnapshot] = None
+_current_key = None
+
+
+def get_snapshot() -> Optional[CatalogSnapshot]:
+    """Devuelve el snapshot vigente (remapeando si otro worker publicó una versión nueva) o None."""
+    global _current, _current_key
+    if not SNAPSHOT_ENABLED:
+        return None
+    try:
+        st = os.stat(_pointer_path())
+    except OSError:
+        return None
+
+    # os.replace crea un inodo nuevo en cada publicación, así que (inodo, mtime) identifica la versión
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    if key != _current_key:
+        nombre = _read_pointer()
+        if nombre is None:
+            return None
+        try:
+            _current = CatalogSnapshot(os.path.join(SNAPSHOT_DIR, nombre))
+            _current_key = key
+        except (OSError, ValueError) as e:
+            print(f"No se pudo mapear el snapshot del catálogo: {e}")
+            return None
+    return _current
+
+
+def refresh_snapshot(conn) -> Optional[Tuple[Optional[str], str]]:
+    """Regenera el snapshot tras una escritura y devuelve lo mismo que build_snapshot_from_db (o None).
+
+    Los errores no invalidan la escritura ya confirmada.
+    """
+    if not SNAPSHOT_ENABLED:
+        return None
+    try:
+        return build_snapshot_from_db(conn)
+    except Exception as e:
+        print(f"Error al regenerar el snapshot del catálogo: {e}")
+        # Mejor servir desde la BD que servir datos obsoletos
+        retire_snapshot()
+
+
+def retire_snapshot() -> None:
+    """Retira el puntero publicado para que todos los workers vuelvan a leer de la BD."""
+    try:
+        os.remove(_pointer_path())
+    except OSError:
+        pass
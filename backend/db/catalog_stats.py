@@ -0,0 +1,312 @@
+import os
+import time
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from backend.db import catalog_snapshot
+
+# Copia columnar en memoria (por proceso) de las columnas numéricas del catálogo para
+# responder estadísticas agrupadas con operaciones vectorizadas de NumPy.
+#
+# - Columnas numéricas (`precio`, `consumo`, `potencia`) en float64 con NaN = NULL.
+# - Columnas de agrupación (`tipo`, `tienda`, `socket`) codificadas como diccionario (int32);
+#   desde el snapshot se copian los códigos tal cual, sin decodificar texto fila a fila.
+# - Las escrituras de la API se aplican de forma incremental (upsert / delete con swap-remove).
+# - El orden por (grupo, valor) que necesitan los percentiles se calcula una vez con lexsort y
+#   después se mantiene con searchsorted + insert/delete en cada escritura, así una consulta es
+#   siempre un filtrado + reduceat en O(n).
+
+COLUMNAS_VALOR = ('precio', 'consumo', 'potencia')
+COLUMNAS_GRUPO = ('tipo', 'tienda', 'socket')
+
+# Recarga completa periódica como red de seguridad para escrituras hechas fuera de este proceso
+STATS_TTL = float(os.getenv('CATALOG_STATS_TTL', '60'))
+
+_INITIAL_CAPACITY = 1024
+
+
+class CatalogStats:
+    """Almacén columnar con actualización incremental y group-by vectorizado."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._n = 0
+        self._pos: Dict[int, int] = {}
+        self._ids = np.empty(_INITIAL_CAPACITY, dtype=np.int64)
+        self._values = {c: np.empty(_INITIAL_CAPACITY, dtype=np.float64) for c in COLUMNAS_VALOR}
+        self._codes = {c: np.empty(_INITIAL_CAPACITY, dtype=np.int32) for c in COLUMNAS_GRUPO}
+        self._dict_values: Dict[str, List[Optional[str]]] = {c: [] for c in COLUMNAS_GRUPO}
+        self._dict_index: Dict[str, Dict[Optional[str], int]] = {c: {} for c in COLUMNAS_GRUPO}
+        # (agrupar_por, campo) -> (filas, códigos, valores), los tres ordenados por (código, valor)
+        self._order_cache: Dict[Any, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self.loaded_at: Optional[float] = None
+        self.source = None
+
+    def __len__(self) -> int:
+        return self._n
+
+    # --- Carga y actualización ---
+
+    def _encode(self, columna: str, valor: Optional[str]) -> int:
+        index = self._dict_index[columna]
+        code = index.get(valor)
+        if code is None:
+            code = len(self._dict_values[columna])
+            index[valor] = code
+            self._dict_values[columna].append(valor)
+        return code
+
+    def _reserve(self, capacity: int) -> None:
+        if capacity <= len(self._ids):
+            return
+        new_capacity = max(capacity, 2 * len(self._ids))
+
+        def grow(arr):
+            out = np.empty(new_capacity, dtype=arr.dtype)
+            out[:self._n] = arr[:self._n]
+            return out
+
+        self._ids = grow(self._ids)
+        self._values = {c: grow(a) for c, a in self._values.items()}
+        self._codes = {c: grow(a) for c, a in self._codes.items()}
+
+    @staticmethod
+    def _to_float(valor) -> float:
+        return np.nan if valor is None else float(valor)
+
+    def _write_row(self, i: int, componente: Dict[str, Any]) -> None:
+        self._ids[i] = componente['id']
+        for c in COLUMNAS_VALOR:
+            self._values[c][i] = self._to_float(componente.get(c))
+        for c in COLUMNAS_GRUPO:
+            self._codes[c][i] = self._encode(c, componente.get(c))
+
+    def load(self, componentes: List[Dict[str, Any]], source=None) -> None:
+        """Reemplaza el contenido completo del almacén."""
+        with self._lock:
+            self._n = 0
+            self._pos = {}
+            self._dict_values = {c: [] for c in COLUMNAS_GRUPO}
+            self._dict_index = {c: {} for c in COLUMNAS_GRUPO}
+            self._reserve(len(componentes))
+            for i, componente in enumerate(componentes):
+                self._write_row(i, componente)
+                self._pos[int(componente['id'])] = i
+            self._n = len(componentes)
+            self._order_cache.clear()
+            self.loaded_at = time.monotonic()
+            self.source = source
+
+    def load_from_snapshot(self, snapshot) -> None:
+        """Carga desde el snapshot mapeado: las columnas numéricas se copian sin pasar por Python."""
+        n = len(snapshot)
+        with self._lock:
+            self._n = 0
+            self._pos = {}
+            self._dict_values = {c: [] for c in COLUMNAS_GRUPO}
+            self._dict_index = {c: {} for c in COLUMNAS_GRUPO}
+            self._reserve(n)
+            self._ids[:n] = np.frombuffer(snapshot.ids, dtype=np.int64)
+            self._values['precio'][:n] = np.frombuffer(snapshot.precio, dtype=np.float64)
+            for c in ('consumo', 'potencia'):
+                raw = np.frombuffer(getattr(snapshot, c), dtype=np.int64)
+                self._values[c][:n] = np.where(raw == catalog_snapshot._NULL_INT, np.nan, raw)
+            for c in COLUMNAS_GRUPO:
+                self._codes[c][:n] = np.frombuffer(snapshot.codigos[c], dtype=np.int32)
+                self._dict_values[c] = list(snapshot.diccionarios[c])
+                self._dict_index[c] = {valor: code for code, valor in enumerate(self._dict_values[c])}
+            self._pos = dict(zip(self._ids[:n].tolist(), range(n)))
+            self._n = n
+            self._order_cache.clear()
+            self.loaded_at = time.monotonic()
+            self.source = snapshot
+
+    # --- Mantenimiento incremental de los órdenes cacheados ---
+
+    @staticmethod
+    def _bounds(entry, code: int, value: float) -> Tuple[int, int]:
+        """Tramo [a, b) de `entry` con clave exactamente (code, value)."""
+        _, codes, values = entry
+        lo = int(np.searchsorted(codes, code, 'left'))
+        hi = int(np.searchsorted(codes, code, 'right'))
+        tramo = values[lo:hi]
+        return lo + int(np.searchsorted(tramo, value, 'left')), lo + int(np.searchsorted(tramo, value, 'right'))
+
+    def _unindex(self, i: int) -> None:
+        """Quita la fila `i` (con sus valores actuales) de cada orden cacheado."""
+        for key, entry in self._order_cache.items():
+            agrupar_por, campo = key
+            value = self._values[campo][i]
+            if np.isnan(value):
+                continue
+            a, b = self._bounds(entry, self._codes[agrupar_por][i], value)
+            pos = a + int(np.flatnonzero(entry[0][a:b] == i)[0])
+            self._order_cache[key] = tuple(np.delete(arr, pos) for arr in entry)
+
+    def _index(self, i: int) -> None:
+        """Inserta la fila `i` (con sus valores actuales) en cada orden cacheado."""
+        for key, entry in self._order_cache.items():
+            agrupar_por, campo = key
+            value = self._values[campo][i]
+            if np.isnan(value):
+                continue
+            code = self._codes[agrupar_por][i]
+            _, pos = self._bounds(entry, code, value)
+            order, codes, values = entry
+            self._order_cache[key] = (np.insert(order, pos, i), np.insert(codes, pos, code), np.insert(values, pos, value))
+
+    def upsert(self, componente: Dict[str, Any]) -> None:
+        with self._lock:
+            i = self._pos.get(int(componente['id']))
+            if i is None:
+                self._reserve(self._n + 1)
+                i = self._n
+                self._n += 1
+                self._pos[int(componente['id'])] = i
+            else:
+                self._unindex(i)
+            self._write_row(i, componente)
+            self._index(i)
+
+    def delete(self, componente_id: int) -> None:
+        with self._lock:
+            i = self._pos.pop(int(componente_id), None)
+            if i is None:
+                return
+            self._unindex(i)
+            last = self._n - 1
+            if i != last:
+                # Swap-remove: la última fila ocupa el hueco
+                self._unindex(last)
+                self._ids[i] = self._ids[last]
+                for arr in self._values.values():
+                    arr[i] = arr[last]
+                for arr in self._codes.values():
+                    arr[i] = arr[last]
+                self._pos[int(self._ids[i])] = i
+                self._index(i)
+            self._n = last
+
+    # --- Consultas ---
+
+    def _sorted_order(self, agrupar_por: str, campo: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Filas válidas (valor no NULL) ordenadas por (grupo, valor), con sus códigos y valores."""
+        key = (agrupar_por, campo)
+        entry = self._order_cache.get(key)
+        if entry is None:
+            values = self._values[campo][:self._n]
+            codes = self._codes[agrupar_por][:self._n]
+            valid = np.flatnonzero(~np.isnan(values))
+            order = valid[np.lexsort((values[valid], codes[valid]))]
+            entry = (order, codes[order], values[order])
+            self._order_cache[key] = entry
+        return entry
+
+    def group_stats(
+        self,
+        agrupar_por: str,
+        campo: str,
+        percentiles: List[float],
+        filtros: Optional[Dict[str, str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """count/min/max/mean/percentiles de `campo` por cada valor de `agrupar_por`."""
+        with self._lock:
+            order, codes, values = self._sorted_order(agrupar_por, campo)
+            for columna, valor in (filtros or {}).items():
+                code = self._dict_index[columna].get(valor)
+                if code is None:
+                    return []
+                # Filtrar una permutación ordenada conserva el orden
+                mask = self._codes[columna][order] == code
+                order, codes, values = order[mask], codes[mask], values[mask]
+            if len(order) == 0:
+                return []
+            etiquetas = self._dict_values[agrupar_por]
+
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(codes)) + 1))
+        ends = np.append(starts[1:], len(codes))
+        counts = ends - starts
+
+        resultado = {
+            'count': counts,
+            'min': values[starts],
+            'max': values[ends - 1],
+            'mean': np.add.reduceat(values, starts) / counts,
+        }
+        # Percentil con interpolación lineal (mismo criterio que np.percentile) sobre cada tramo ordenado
+        for q in percentiles:
+            pos = starts + (q / 100.0) * (counts - 1)
+            lo = np.floor(pos).astype(np.int64)
+            hi = np.ceil(pos).astype(np.int64)
+            resultado[f'p{q:g}'] = values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+        grupos = []
+        for g in range(len(starts)):
+            fila = {'grupo': etiquetas[codes[starts[g]]]}
+            for nombre, arr in resultado.items():
+                fila[nombre] = arr[g].item()
+            grupos.append(fila)
+        return grupos
+
+
+_store = CatalogStats()
+
+
+def get_store(conn_factory) -> CatalogStats:
+    """Devuelve el almacén del proceso, (re)cargándolo si está vacío, caducado o hay un snapshot nuevo.
+
+    `conn_factory` es un context manager que entrega una conexión; solo se usa si no hay snapshot.
+    """
+    snapshot = catalog_snapshot.get_snapshot()
+    if snapshot is not None:
+        if _store.source is not snapshot:
+            _store.load_from_snapshot(snapshot)
+        return _store
+
+    caducado = _store.loaded_at is None or time.monotonic() - _store.loaded_at > STATS_TTL
+    if caducado:
+        with conn_factory() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"SELECT id, {', '.join(COLUMNAS_GRUPO + COLUMNAS_VALOR)} FROM componentes")
+            componentes = cursor.fetchall()
+            cursor.close()
+        _store.load(componentes)
+    return _store
+
+
+def apply_upsert(componente: Dict[str, Any], publicado: Optional[Tuple[Optional[str], str]] = None) -> None:
+    """Aplica una creación/actualización hecha por este proceso.
+
+    `publicado` es lo que devolvió refresh_snapshot() para esa escritura (None sin snapshot).
+    """
+    if _store.loaded_at is None:
+        return
+    _store.upsert(componente)
+    _sync_after_own_publish(publicado)
+
+
+def apply_delete(componente_id: int, publicado: Optional[Tuple[Optional[str], str]] = None) -> None:
+    """Aplica un borrado hecho por este proceso."""
+    if _store.loaded_at is None:
+        return
+    _store.delete(componente_id)
+    _sync_after_own_publish(publicado)
+
+
+def _sync_after_own_publish(publicado: Optional[Tuple[Optional[str], str]]) -> None:
+    # Si el almacén salió del snapshot vigente justo antes de nuestra publicación, el nuevo solo
+    # añade nuestra escritura (ya aplicada de forma incremental) y basta con adoptarlo. Si no, otro
+    # worker publicó cambios que este almacén no ha visto: hay que recargar desde el snapshot nuevo.
+    if publicado is None:
+        return  # sin snapshot, la recarga por STATS_TTL cubre las escrituras de otros procesos
+    snapshot = catalog_snapshot.get_snapshot()
+    if snapshot is None:
+        return
+    anterior, nuevo = publicado
+    source = _store.source
+    if source is not None and source.nombre == anterior and snapshot.nombre == nuevo:
+        _store.source = snapshot
+    else:
+        _store.load_from_snapshot(snapshot)
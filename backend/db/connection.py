@@ -1,6 +1,8 @@
 import os
+import time
+import threading
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
 from dotenv import load_dotenv
 
 dotenv_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -19,9 +21,20 @@ DB_CONFIG = {
     'database': os.getenv('DB_NAME', 'pcparts'),
     'user': os.getenv('DB_USER', 'root'),
     'password': os.getenv('DB_PASS', ''),
-    'collation': 'utf8mb4_general_ci'
+    'collation': 'utf8mb4_general_ci',
+    # Las conexiones del pool se reutilizan sin resetear la sesión (para conservar las sentencias
+    # preparadas), así que cada lectura debe ver los datos confirmados más recientes.
+    'autocommit': True
 }
 
+# Tamaño del pool POR PROCESO (mysql.connector admite como máximo 32). El pool abre todas sus
+# conexiones al crearse, así que el total es workers x DB_POOL_SIZE y debe quedar por debajo de
+# `max_connections` de MariaDB (151 por defecto). Si se agota se abre una conexión suelta.
+DB_POOL_SIZE = max(1, min(int(os.getenv('DB_POOL_SIZE', '4')), pooling.CNX_POOL_MAXSIZE))
+
+# Si no se pudo crear el pool, se usan conexiones sueltas y no se reintenta antes de este plazo
+_POOL_RETRY_SECONDS = 30.0
+
 # Verificar que las variables de entorno esenciales estén cargadas
 # Esta verificación ahora reflejará mejor si las variables del .env se cargaron o no.
 if not DB_CONFIG['user'] or not DB_CONFIG['password'] or DB_CONFIG['user'] == 'root': # Añadida comprobación extra por si 'root' es el default no deseado
@@ -31,12 +44,69 @@ if not DB_CONFIG['user'] or not DB_CONFIG['password'] or DB_CONFIG['user'] == 'r
         print(f"Intentando cargar DB_USER: {os.getenv('DB_USER')}, DB_PASS: {'*' * len(os.getenv('DB_PASS')) if os.getenv('DB_PASS') else None}")
 
 
-def create_db_connection():
-    """Crea una conexión a la base de datos."""
-    connection = None
+_pool = None
+_pool_error_at = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Pool del proceso, creado la primera vez que se usa; None si no se pudo crear (aún)."""
+    global _pool, _pool_error_at
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                if _pool_error_at is not None and time.monotonic() - _pool_error_at < _POOL_RETRY_SECONDS:
+                    return None
+                try:
+                    _pool = pooling.MySQLConnectionPool(
+                        pool_name="pcparts",
+                        pool_size=DB_POOL_SIZE,
+                        pool_reset_session=False,
+                        **DB_CONFIG
+                    )
+                    _pool_error_at = None
+                except Error as e:
+                    _pool_error_at = time.monotonic()
+                    print(f"ADVERTENCIA: No se pudo crear el pool de conexiones a MariaDB ({e}); se usarán conexiones sueltas y se reintentará en {_POOL_RETRY_SECONDS:.0f} s.")
+    return _pool
+
+
+def _direct_connection():
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
+        return mysql.connector.connect(**DB_CONFIG)
     except Error as e:
         print(f"Error '{e}' al conectar a MariaDB desde create_db_connection")
-        # Podrías relanzar la excepción o manejarla de forma más específica si es necesario
-    return connection
\ No newline at end of file
+        return None
+
+
+def create_db_connection(pooled: bool = True):
+    """Obtiene una conexión del pool (close() la devuelve al pool) o una suelta.
+
+    Se usa una conexión suelta si `pooled` es False (p. ej. el proceso padre, que no atiende
+    peticiones y no debe mantener un pool abierto), si el pool está agotado o si no se pudo crear.
+    """
+    pool = _get_pool() if pooled else None
+    if pool is not None:
+        try:
+            return pool.get_connection()
+        except pooling.PoolError:
+            pass  # pool agotado
+        except Error as e:
+            print(f"Error '{e}' al conectar a MariaDB desde create_db_connection")
+            return None
+    return _direct_connection()
+
+
+def close_db_connection(conn):
+    """Devuelve la conexión al pool (o cierra la conexión suelta), esté o no viva.
+
+    Hay que llamarla siempre, también si la conexión se cayó: un PooledMySQLConnection solo vuelve
+    al pool con close() y, si no, el hueco se pierde para siempre. El pool reconecta las caídas
+    al volver a entregarlas.
+    """
+    if conn is None:
+        return
+    try:
+        conn.close()
+    except Error as e:
+        print(f"Error '{e}' al cerrar la conexión a MariaDB")
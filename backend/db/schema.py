@@ -0,0 +1,190 @@
+import os
+from typing import Dict, List, Optional, Tuple
+
+from mysql.connector import Error
+
+# Migraciones versionadas del esquema. Cada migración se aplica una sola vez y queda registrada
+# en `schema_migrations`; se añaden nuevas al final de MIGRACIONES, nunca se editan las existentes.
+# Con DB_AUTO_MIGRATE=0 el arranque solo verifica el esquema y avisa de lo que falte.
+
+DB_AUTO_MIGRATE = os.getenv('DB_AUTO_MIGRATE', '1').lower() in ('1', 'true', 'yes', 'si')
+
+# Evita que varios workers apliquen las mismas migraciones a la vez
+_LOCK_NAME = 'pcparts_schema_migrations'
+_LOCK_TIMEOUT = 30
+
+# (nombre, columnas, único) de los índices que necesitan las rutas de acceso de la API
+INDICES: List[Tuple[str, str, bool]] = [
+    ('idx_componentes_tipo', 'tipo', False),
+    ('idx_componentes_socket', 'socket', False),
+    ('idx_componentes_tienda', 'tienda', False),
+    ('idx_componentes_precio', 'precio', False),
+    ('uq_componentes_modelo_tienda', 'modelo, tienda', True),  # clave natural
+]
+
+COLUMNAS_REQUERIDAS = ('id', 'tipo', 'modelo', 'precio', 'tienda', 'url', 'consumo', 'socket', 'rams', 'potencia', 'img')
+
+
+def _crear_tabla(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS componentes (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            tipo VARCHAR(50) NOT NULL,
+            modelo VARCHAR(255) NOT NULL,
+            precio DECIMAL(10, 2) NOT NULL,
+            tienda VARCHAR(100) NOT NULL,
+            url VARCHAR(1024) NULL,
+            consumo INT NULL,
+            socket VARCHAR(50) NULL,
+            rams VARCHAR(100) NULL,
+            potencia INT NULL,
+            img VARCHAR(1024) NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+    """)
+
+
+def _columnas(columnas: str) -> Tuple[str, ...]:
+    return tuple(c.strip().lower() for c in columnas.split(','))
+
+
+def _indices_existentes(cursor) -> Dict[str, Tuple[Tuple[str, ...], bool]]:
+    """{nombre_indice: (columnas en orden, es_unico)} de la tabla `componentes`."""
+    cursor.execute(
+        "SELECT INDEX_NAME, NON_UNIQUE, COLUMN_NAME FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'componentes' "
+        "ORDER BY INDEX_NAME, SEQ_IN_INDEX"
+    )
+    indices: Dict[str, Tuple[Tuple[str, ...], bool]] = {}
+    for nombre, no_unico, columna in cursor.fetchall():
+        columnas, _ = indices.get(nombre, ((), False))
+        indices[nombre] = (columnas + (columna.lower(),), not no_unico)
+    return indices
+
+
+def _buscar_indice(existentes, columnas: str) -> Optional[Tuple[str, bool]]:
+    """(nombre, es_unico) de un índice existente sobre exactamente esas columnas, con o sin el
+    nombre esperado (p. ej. creado a mano); se prefiere uno UNIQUE si hay varios."""
+    buscadas = _columnas(columnas)
+    candidatos = [(nombre, unico) for nombre, (cols, unico) in existentes.items() if cols == buscadas]
+    return max(candidatos, key=lambda c: c[1], default=None)
+
+
+def _crear_indices(cursor):
+    existentes = _indices_existentes(cursor)
+    for nombre, columnas, unico in INDICES:
+        encontrado = _buscar_indice(existentes, columnas)
+        if encontrado is not None and (encontrado[1] or not unico):
+            continue
+        if nombre in existentes:
+            print(f"ADVERTENCIA: Ya existe un índice {nombre} distinto del esperado ({columnas}{', UNIQUE' if unico else ''}); no se modifica.")
+            continue
+        try:
+            cursor.execute(f"CREATE {'UNIQUE ' if unico else ''}INDEX {nombre} ON componentes ({columnas})")
+        except Error as e:
+            if not (unico and e.errno == 1062):
+                raise
+            # Ya hay duplicados de la clave natural: se deja (o se crea) el índice sin unicidad y se avisa
+            if encontrado is None:
+                print(f"ADVERTENCIA: Hay componentes duplicados en ({columnas}); se crea {nombre} sin restricción UNIQUE.")
+                cursor.execute(f"CREATE INDEX {nombre} ON componentes ({columnas})")
+            else:
+                print(f"ADVERTENCIA: Hay componentes duplicados en ({columnas}); se mantiene {encontrado[0]} sin restricción UNIQUE.")
+
+
+# (versión, descripción, función que recibe un cursor)
+MIGRACIONES = [
+    (1, "Crear tabla componentes", _crear_tabla),
+    (2, "Índices por tipo, socket, tienda, precio y clave natural (modelo, tienda)", _crear_indices),
+]
+
+
+def _versiones_aplicadas(cursor) -> set:
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            descripcion VARCHAR(255) NOT NULL,
+            aplicada_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {version for (version,) in cursor.fetchall()}
+
+
+def apply_migrations(conn) -> List[int]:
+    """Aplica las migraciones pendientes en orden y devuelve las versiones aplicadas."""
+    cursor = conn.cursor()
+    aplicadas = []
+    cursor.execute("SELECT GET_LOCK(%s, %s)", (_LOCK_NAME, _LOCK_TIMEOUT))
+    (obtenido,) = cursor.fetchone()
+    if not obtenido:
+        cursor.close()
+        raise RuntimeError("No se pudo obtener el lock de migraciones del esquema.")
+    try:
+        hechas = _versiones_aplicadas(cursor)
+        for version, descripcion, migrar in MIGRACIONES:
+            if version in hechas:
+                continue
+            print(f"Aplicando migración {version}: {descripcion}")
+            migrar(cursor)
+            cursor.execute("INSERT INTO schema_migrations (version, descripcion) VALUES (%s, %s)", (version, descripcion))
+            conn.commit()
+            aplicadas.append(version)
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (_LOCK_NAME,))
+        cursor.fetchall()
+        cursor.close()
+    return aplicadas
+
+
+def verify_schema(conn) -> List[str]:
+    """Devuelve la lista de problemas encontrados (vacía si el esquema es el esperado)."""
+    cursor = conn.cursor()
+    problemas = []
+    cursor.execute(
+        "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'componentes'"
+    )
+    columnas = {nombre for (nombre,) in cursor.fetchall()}
+    if not columnas:
+        cursor.close()
+        return ["No existe la tabla componentes."]
+    for columna in COLUMNAS_REQUERIDAS:
+        if columna not in columnas:
+            problemas.append(f"Falta la columna componentes.{columna}.")
+
+    existentes = _indices_existentes(cursor)
+    cursor.close()
+    for nombre, columnas_indice, unico in INDICES:
+        encontrado = _buscar_indice(existentes, columnas_indice)
+        if encontrado is None:
+            problemas.append(f"Falta el índice {nombre} ({columnas_indice}).")
+        elif unico and not encontrado[1]:
+            problemas.append(f"El índice {encontrado[0]} ({columnas_indice}) no es UNIQUE.")
+    return problemas
+
+
+def bootstrap_schema(conn) -> List[str]:
+    """Aplica las migraciones pendientes (si DB_AUTO_MIGRATE) y verifica el esquema, avisando de lo que falte."""
+    if DB_AUTO_MIGRATE:
+        apply_migrations(conn)
+    problemas = verify_schema(conn)
+    for problema in problemas:
+        print(f"ADVERTENCIA de esquema: {problema}")
+    if not problemas:
+        print("Esquema de la base de datos verificado.")
+    return problemas
+
+
+if __name__ == "__main__":
+    from backend.db.connection import create_db_connection
+
+    conexion = create_db_connection(pooled=False)
+    if conexion is None:
+        raise SystemExit("No se pudo conectar a la base de datos.")
+    try:
+        aplicadas = apply_migrations(conexion)
+        print(f"Migraciones aplicadas: {aplicadas or 'ninguna (esquema al día)'}")
+        for problema in verify_schema(conexion):
+            print(f"ADVERTENCIA de esquema: {problema}")
+    finally:
+        conexion.close()
@@ -0,0 +1,84 @@
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, Tuple
+
+# Sentencias SQL de `componentes` y caché por conexión de sentencias preparadas en el servidor.
+#
+# Todo el texto SQL sale de constantes de este módulo: los INSERT/UPDATE con columnas variables
+# se construyen solo a partir de la lista blanca COLUMNAS_EDITABLES (en orden canónico) y se
+# memorizan, así que cada combinación de columnas tiene siempre el mismo objeto str. Eso importa
+# porque los cursores preparados de mysql.connector solo reutilizan la sentencia ya preparada
+# cuando reciben el mismo objeto (`operation is self._executed`); con otro objeto la re-preparan.
+
+COLUMNAS_EDITABLES = ('tipo', 'modelo', 'precio', 'tienda', 'url', 'consumo', 'socket', 'rams', 'potencia', 'img')
+COLUMNAS_SELECT = ', '.join(('id',) + COLUMNAS_EDITABLES)
+
+SQL_SELECT_ALL = f"SELECT {COLUMNAS_SELECT} FROM componentes"
+SQL_SELECT_BY_ID = f"SELECT {COLUMNAS_SELECT} FROM componentes WHERE id = %s"
+SQL_SEARCH_BY_MODELO = f"SELECT {COLUMNAS_SELECT} FROM componentes WHERE modelo LIKE %s"
+SQL_DELETE_BY_ID = "DELETE FROM componentes WHERE id = %s"
+
+# Sentencias preparadas que se mantienen abiertas por conexión (las menos usadas se cierran)
+STATEMENT_CACHE_SIZE = 64
+
+_update_sql: Dict[FrozenSet[str], Tuple[str, Tuple[str, ...]]] = {}
+_insert_sql: Dict[FrozenSet[str], Tuple[str, Tuple[str, ...]]] = {}
+
+
+def _whitelisted(columnas: Iterable[str]) -> Tuple[FrozenSet[str], Tuple[str, ...]]:
+    conjunto = frozenset(columnas)
+    no_permitidas = conjunto.difference(COLUMNAS_EDITABLES)
+    if no_permitidas:
+        raise ValueError(f"Columnas no permitidas: {', '.join(sorted(no_permitidas))}")
+    if not conjunto:
+        raise ValueError("No se indicó ninguna columna.")
+    return conjunto, tuple(c for c in COLUMNAS_EDITABLES if c in conjunto)
+
+
+def update_sql(columnas: Iterable[str]) -> Tuple[str, Tuple[str, ...]]:
+    """UPDATE por ID para un subconjunto de COLUMNAS_EDITABLES; devuelve (sql, orden de columnas)."""
+    conjunto, orden = _whitelisted(columnas)
+    sentencia = _update_sql.get(conjunto)
+    if sentencia is None:
+        set_clause = ", ".join(f"{c} = %s" for c in orden)
+        sentencia = _update_sql.setdefault(conjunto, (f"UPDATE componentes SET {set_clause} WHERE id = %s", orden))
+    return sentencia
+
+
+def insert_sql(columnas: Iterable[str]) -> Tuple[str, Tuple[str, ...]]:
+    """INSERT para un subconjunto de COLUMNAS_EDITABLES; devuelve (sql, orden de columnas)."""
+    conjunto, orden = _whitelisted(columnas)
+    sentencia = _insert_sql.get(conjunto)
+    if sentencia is None:
+        placeholders = ", ".join(["%s"] * len(orden))
+        sentencia = _insert_sql.setdefault(conjunto, (f"INSERT INTO componentes ({', '.join(orden)}) VALUES ({placeholders})", orden))
+    return sentencia
+
+
+def prepared_cursor(conn, sql: str):
+    """Cursor preparado (con filas como dict) para `sql`, reutilizado mientras viva la sesión.
+
+    La caché se guarda en la conexión física (no en el envoltorio del pool) y se descarta si la
+    conexión se reconectó, porque las sentencias preparadas pertenecen a la sesión del servidor.
+    """
+    cnx = getattr(conn, '_cnx', None) or conn
+    session = cnx.connection_id
+    cache = getattr(cnx, '_pcparts_statements', None)
+    if cache is None or getattr(cnx, '_pcparts_session', None) != session:
+        cache = OrderedDict()
+        cnx._pcparts_statements = cache
+        cnx._pcparts_session = session
+
+    cursor = cache.get(sql)
+    if cursor is not None:
+        cache.move_to_end(sql)
+        return cursor
+
+    cursor = conn.cursor(prepared=True, dictionary=True)
+    cache[sql] = cursor
+    if len(cache) > STATEMENT_CACHE_SIZE:
+        _, antiguo = cache.popitem(last=False)
+        try:
+            antiguo.close()  # libera la sentencia en el servidor
+        except Exception:
+            pass
+    return cursor
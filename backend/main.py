@@ -1,22 +1,98 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import HTMLResponse
+from contextlib import asynccontextmanager
+import os
 import platform # Para información del SO
 import psutil   # Para uso de CPU y Memoria
-from fastapi_mcp import FastApiMCP # <--- Importar FastApiMCP
 
 # Importamos la función de conexión para el health check y el router de componentes
-from backend.db.connection import create_db_connection # Para el health_check
+from backend.db.connection import create_db_connection, close_db_connection # Para el health_check
+from backend.db import catalog_snapshot
+from backend.db.schema import bootstrap_schema
 from backend.routes import componentes_routes
+from backend.mcp_dispatch import DirectDispatchMCP, MCP_DIRECT_DISPATCH
+from backend.middleware.admission import AdmissionMiddleware, admission
+from backend.controllers.coalescing import coalescer
 
-app = FastAPI(title="PC Parts API", version="1.0.0")
+
+def ensure_schema(pooled: bool = True):
+    """Aplica las migraciones pendientes y verifica tabla e índices de `componentes`."""
+    conn = create_db_connection(pooled)
+    if conn is None:
+        print("ADVERTENCIA: No se pudo verificar el esquema de la base de datos (sin conexión).")
+        return
+    try:
+        bootstrap_schema(conn)
+    except Exception as e:
+        print(f"Error al verificar/migrar el esquema de la base de datos: {e}")
+    finally:
+        close_db_connection(conn)
+
+
+# El proceso padre de __main__ fija esta variable tras publicar el snapshot; los workers la heredan
+SNAPSHOT_PUBLICADO_ENV = "PCPARTS_SNAPSHOT_PUBLICADO"
+
+
+def ensure_catalog_snapshot(pooled: bool = True):
+    """Reconstruye y publica el snapshot del catálogo desde la BD (si está habilitado).
+
+    Siempre se reconstruye: el archivo sobrevive a los reinicios y la BD puede haber cambiado
+    fuera de la API (cargas manuales, otro despliegue, una ejecución con CATALOG_SNAPSHOT=0).
+    """
+    if not catalog_snapshot.SNAPSHOT_ENABLED:
+        return
+    conn = create_db_connection(pooled)
+    if conn is None:
+        print("ADVERTENCIA: No se pudo crear el snapshot del catálogo; las lecturas irán a la base de datos.")
+        # Un snapshot anterior podría estar obsoleto: se retira para no servirlo
+        catalog_snapshot.retire_snapshot()
+        return
+    try:
+        catalog_snapshot.build_snapshot_from_db(conn)
+    except Exception as e:
+        print(f"Error al crear el snapshot del catálogo: {e}")
+        catalog_snapshot.retire_snapshot()
+    finally:
+        close_db_connection(conn)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ensure_schema()
+    if os.getenv(SNAPSHOT_PUBLICADO_ENV) == "1":
+        # El proceso padre ya lo reconstruyó antes de arrancar los workers: aquí solo se mapea
+        if catalog_snapshot.SNAPSHOT_ENABLED and catalog_snapshot.get_snapshot() is None:
+            print("ADVERTENCIA: No hay snapshot del catálogo publicado; las lecturas irán a la base de datos.")
+    else:
+        # Arrancado directamente con `uvicorn backend.main:app`: no hay proceso padre que lo haga
+        ensure_catalog_snapshot()
+    yield
+
+
+app = FastAPI(title="PC Parts API", version="1.0.0", lifespan=lifespan)
 
 # Incluir el router de componentes
 app.include_router(componentes_routes.router)
 
+# Control de admisión: límites de concurrencia por clase de ruta y 503 + Retry-After ante saturación
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
 # Configurar y montar FastAPI-MCP
-mcp = FastApiMCP(app) # <--- Crear una instancia de FastApiMCP con tu app FastAPI
+# Por defecto las herramientas de componentes se despachan en proceso (ver backend/mcp_dispatch.py);
+# MCP_DIRECT_DISPATCH=0 vuelve al camino HTTP interno de fastapi-mcp.
+mcp = DirectDispatchMCP(app, direct=MCP_DIRECT_DISPATCH) # <--- Crear una instancia de FastApiMCP con tu app FastAPI
 mcp.mount()           # <--- Montar el servidor MCP en la ruta /mcp por defecto
 
+@app.get("/metricas/admision", tags=["General"])
+async def admission_metrics():
+    """Profundidad de cola, peticiones en curso y contadores de descarte por clase de ruta."""
+    return admission.metrics()
+
+@app.get("/metricas/coalescencia", tags=["General"])
+async def coalescing_metrics():
+    """Lecturas ejecutadas en la BD frente a lecturas que se unieron a una ejecución idéntica en vuelo."""
+    return coalescer.metrics()
+
 @app.get("/", response_class=HTMLResponse, tags=["General"])
 async def health_check():
     api_status = "OPERATIVA"
@@ -51,8 +127,7 @@ async def health_check():
         db_status_color = "red"
         print(f"Excepción en health_check al verificar la BD: {e}")
     finally:
-        if conn and conn.is_connected():
-            conn.close()
+        close_db_connection(conn)
 
     html_content = f"""
     <!DOCTYPE html>
@@ -192,5 +267,25 @@ async def health_check():
 
 
 if __name__ == "__main__":
+    import argparse
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+
+    parser = argparse.ArgumentParser(description="Servidor de la PC Parts API")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+                        help="Número de procesos worker (por defecto, uno por núcleo)")
+    parser.add_argument("--dev", action="store_true", help="Modo desarrollo: un solo proceso con recarga automática")
+    args = parser.parse_args()
+
+    # Se migra el esquema y se reconstruye el snapshot una sola vez en el proceso padre, antes de
+    # arrancar los workers, para que estos solo verifiquen y mapeen
+    # Con conexiones sueltas: el padre no atiende peticiones y no debe dejar un pool abierto
+    ensure_schema(pooled=False)
+    ensure_catalog_snapshot(pooled=False)
+    os.environ[SNAPSHOT_PUBLICADO_ENV] = "1"
+
+    if args.dev:
+        uvicorn.run("backend.main:app", host=args.host, port=args.port, reload=True)
+    else:
+        uvicorn.run("backend.main:app", host=args.host, port=args.port, workers=args.workers)
\ No newline at end of file
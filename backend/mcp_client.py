@@ -0,0 +1,225 @@
+from langchain_core.tools import Tool
+import requests
+import json
+import socket
+import threading
+from urllib.parse import urljoin
+import uuid # Necesario para generar IDs de solicitud únicos
+
+# Cliente MCP (transporte SSE) compartido por ollama_client.py, claude.py y el arnés de replay.
+#
+# Flujo del protocolo con fastapi-mcp:
+#   1. GET /mcp abre un stream SSE que se mantiene abierto; el primer evento `endpoint` trae la
+#      URL de mensajes con el session_id.
+#   2. Las peticiones JSON-RPC (initialize, tools/call...) se envían por POST a esa URL; el
+#      servidor responde 202 y la respuesta real llega como evento `message` por el stream SSE.
+#   3. Un hilo lector entrega cada respuesta a quien espera su `id`.
+
+MCP_PROTOCOL_VERSION = "2024-11-05"
+
+
+class MCPClient:
+    def __init__(self, mcp_url, timeout=20):
+        self.mcp_url = mcp_url
+        self.timeout = timeout
+        self.session_id = None
+        self.messages_url = None
+        self._stream = None
+        self._closed = False
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        # Inicializar conexión con el servidor MCP
+        self._connect()
+        if self.session_id:
+            self._initialize()
+        if not self.session_id:
+            print("ADVERTENCIA: No se pudo establecer la sesión MCP. Las herramientas podrían no funcionar como se espera o usar datos de marcador de posición.")
+
+    def _connect(self):
+        try:
+            print(f"Intentando conectar a: {self.mcp_url}")
+            # El stream SSE debe seguir abierto durante toda la sesión: las respuestas llegan por él
+            self._stream = requests.get(self.mcp_url, stream=True, timeout=(10, None), headers={'Accept': 'text/event-stream'})
+            print(f"Respuesta recibida del servidor MCP, estado: {self._stream.status_code}")
+            self._stream.raise_for_status() # Lanza una excepción para errores HTTP (4xx o 5xx)
+
+            lines = self._stream.iter_lines(decode_unicode=True)
+            event = None
+            for line in lines:
+                line = line.strip()
+                if line.startswith('event:'):
+                    event = line[len('event:'):].strip()
+                elif line.startswith('data:') and event == 'endpoint':
+                    self.messages_url = urljoin(self.mcp_url, line[len('data:'):].strip())
+                    self.session_id = self.messages_url.split('session_id=')[-1].split('&')[0] or None
+                    print(f"Conexión establecida con el servidor MCP. Session ID: {self.session_id}")
+                    print(f"URL de mensajes: {self.messages_url}")
+                    break
+            else:
+                print("No se encontró el evento 'endpoint' con la URL de mensajes en la respuesta del servidor MCP.")
+                return
+
+            threading.Thread(target=self._read_stream, args=(lines,), daemon=True).start()
+
+        except requests.exceptions.Timeout:
+            print(f"Error de red al conectar con el servidor MCP: Timeout después de 10 segundos esperando respuesta de {self.mcp_url}")
+        except requests.exceptions.RequestException as e:
+            print(f"Error de red al conectar con el servidor MCP: {str(e)}")
+        except Exception as e:
+            print(f"Error inesperado al conectar con el servidor MCP: {type(e).__name__} - {str(e)}")
+
+    def _read_stream(self, lines):
+        """Hilo lector: reparte las respuestas JSON-RPC del stream SSE según su id."""
+        try:
+            for line in lines:
+                line = line.strip()
+                if not line.startswith('data:'):
+                    continue
+                try:
+                    message = json.loads(line[len('data:'):].strip())
+                except json.JSONDecodeError:
+                    print(f"Error al decodificar JSON del stream MCP: {line}")
+                    continue
+                with self._pending_lock:
+                    waiter = self._pending.pop(message.get('id'), None)
+                if waiter is not None:
+                    waiter['response'] = message
+                    waiter['event'].set()
+        except Exception as e:
+            if not self._closed:
+                print(f"Stream MCP cerrado: {type(e).__name__} - {e}")
+
+    def _rpc(self, method, params=None):
+        """Envía una petición JSON-RPC y espera su respuesta por el stream SSE."""
+        request_id = str(uuid.uuid4())
+        waiter = {'event': threading.Event(), 'response': None}
+        with self._pending_lock:
+            self._pending[request_id] = waiter
+        payload = {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params or {}}
+        try:
+            response = requests.post(self.messages_url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            if not waiter['event'].wait(self.timeout):
+                return {"error": {"message": f"Timeout esperando la respuesta a {method}"}}
+            return waiter['response']
+        finally:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+
+    def _initialize(self):
+        try:
+            response = self._rpc("initialize", {
+                "protocolVersion": MCP_PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": {"name": "pcparts-mcp-client", "version": "1.0.0"},
+            })
+            if "error" in response:
+                print(f"Error al inicializar la sesión MCP: {response['error']}")
+                self.session_id = None
+                return
+            requests.post(self.messages_url, json={"jsonrpc": "2.0", "method": "notifications/initialized"}, timeout=self.timeout).raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"Error de red al inicializar la sesión MCP: {str(e)}")
+            self.session_id = None
+
+    def close(self):
+        if self._stream is None:
+            return
+        self._closed = True
+        # Cerrar la respuesta espera a que el hilo lector suelte el socket (hasta el siguiente ping
+        # del servidor); se corta antes el socket para que la lectura termine en el acto.
+        sock = getattr(getattr(self._stream.raw, 'connection', None), 'sock', None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._stream.close()
+
+    def get_tools(self):
+        # El nombre de la herramienta DEBE coincidir con el expuesto por fastapi-mcp
+        # (el operation_id de cada ruta en backend/routes/componentes_routes.py).
+
+        return [
+            Tool(
+                name="listar_todos_los_componentes",
+                func=self._listar_componentes,
+                description="DEBES usar esta herramienta para obtener una lista completa de todos los componentes de PC cuando el usuario pida una lista general o explorar opciones. No necesita parámetros. La salida es una lista de componentes en formato JSON."
+            ),
+            Tool(
+                name="buscar_componente_por_nombre",
+                func=self._buscar_componente,
+                description="DEBES usar esta herramienta para encontrar componentes específicos por su nombre o modelo. Proporciona el nombre o modelo como el parámetro 'query'. La salida es una lista de componentes coincidentes en formato JSON, incluyendo sus IDs. Necesitas el ID para obtener detalles completos."
+            ),
+            Tool(
+                name="obtener_detalles_componente_por_id",
+                func=self._obtener_componente_por_id,
+                description="DEBES usar esta herramienta para obtener todos los detalles de un componente específico, incluyendo su precio, una vez que tengas su 'componente_id' (obtenido de 'buscar_componente_por_nombre' o 'listar_todos_los_componentes'). El parámetro debe ser el ID numérico del componente. La salida son los detalles completos del componente en formato JSON."
+            ),
+            Tool(
+                name="estadisticas_componentes",
+                func=self._estadisticas_componentes,
+                description="DEBES usar esta herramienta para preguntas de precios o consumos agregados (mediana, promedio, mínimo, máximo) por tipo, tienda o socket, en lugar de listar todos los componentes. La entrada es un objeto JSON con 'agrupar_por' (tipo, tienda o socket), 'campo' (precio, consumo o potencia) y filtros opcionales 'tipo', 'tienda', 'socket' y 'percentiles'."
+            )
+        ]
+
+    def _send_mcp_request(self, tool_name, tool_input):
+        if not self.session_id or not self.messages_url:
+            print("MCPClient: No hay sesión activa para enviar la solicitud.")
+            return {"error": "No session"}
+
+        print(f"Enviando solicitud MCP tools/call '{tool_name}': {json.dumps(tool_input, ensure_ascii=False)}")
+        try:
+            response = self._rpc("tools/call", {"name": tool_name, "arguments": tool_input})
+        except requests.exceptions.Timeout:
+            print(f"Timeout al enviar solicitud MCP para {tool_name}")
+            return {"error": f"Timeout for tool {tool_name}"}
+        except requests.exceptions.RequestException as e:
+            print(f"Error de red al enviar solicitud MCP para {tool_name}: {e}")
+            return {"error": f"Network error for tool {tool_name}: {e}"}
+
+        if "error" in response:
+            return {"error": response["error"].get("message")}
+        result = response.get("result", {})
+        text = "".join(c.get("text", "") for c in result.get("content", []) if c.get("type") == "text")
+        if result.get("isError"):
+            print(f"Error de herramienta recibido: {text}")
+            return {"error": text}
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return text
+
+    @staticmethod
+    def _as_tool_output(tool_output):
+        # El agente Langchain espera un string como resultado de la herramienta.
+        if isinstance(tool_output, dict) and "error" in tool_output:
+            return f"Error de la herramienta: {tool_output['error']}"
+        elif tool_output is None:
+            return "Error: No se recibió respuesta de la herramienta."
+        return json.dumps(tool_output, ensure_ascii=False)
+
+    def _listar_componentes(self, query=""): # Langchain a veces pasa un string vacío como query
+        print(f"MCPClient._listar_componentes llamado con query: '{query}' (será ignorado)")
+        # Para una herramienta que no toma argumentos, tool_input es un diccionario vacío.
+        return self._as_tool_output(self._send_mcp_request(tool_name="listar_todos_los_componentes", tool_input={}))
+
+    def _buscar_componente(self, query: str):
+        print(f"MCPClient._buscar_componente llamado con query: '{query}'")
+        return self._as_tool_output(self._send_mcp_request(tool_name="buscar_componente_por_nombre", tool_input={"query": query.strip().strip('"\'')}))
+
+    def _obtener_componente_por_id(self, component_id: str): # Langchain pasa los argumentos como strings
+        print(f"MCPClient._obtener_componente_por_id llamado con ID: '{component_id}'")
+        try:
+            tool_input_id = int(str(component_id).strip().strip('"\''))
+        except ValueError:
+            return f"Error: '{component_id}' no es un ID numérico de componente."
+        return self._as_tool_output(self._send_mcp_request(tool_name="obtener_detalles_componente_por_id", tool_input={"componente_id": tool_input_id}))
+
+    def _estadisticas_componentes(self, query: str = ""):
+        print(f"MCPClient._estadisticas_componentes llamado con: '{query}'")
+        try:
+            tool_input = json.loads(query) if query and query.strip() else {}
+        except json.JSONDecodeError:
+            return "Error: la entrada debe ser un objeto JSON, p. ej. {\"agrupar_por\": \"tienda\", \"campo\": \"precio\", \"tipo\": \"GPU\"}."
+        return self._as_tool_output(self._send_mcp_request(tool_name="estadisticas_componentes", tool_input=tool_input))
@@ -0,0 +1,193 @@
+import os
+import json
+import inspect
+from typing import Any, Callable, Dict, List, Literal, Optional, Union
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi_mcp import FastApiMCP
+from mcp import types
+from pydantic import BaseModel, Field, ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from backend.db import catalog_stats
+from backend.controllers.coalescing import coalescer, json_default
+from backend.middleware.admission import admission, classify_tool, mcp_internal_call, AdmissionRejected
+from backend.db.catalog_snapshot import get_snapshot
+from backend.controllers.componentes_controller import (
+    get_all_componentes_logic,
+    get_componente_by_id_logic,
+    get_all_componentes_snapshot_logic,
+    get_componente_by_id_snapshot_logic,
+    get_componentes_stats_logic,
+    search_componentes_by_name_logic,
+    create_componente_logic,
+    update_componente_logic,
+    delete_componente_logic,
+)
+from backend.routes.componentes_routes import (
+    ComponenteCreate,
+    ComponenteUpdate,
+    db_conn,
+    coalesced_read,
+    after_componente_written,
+    after_componente_deleted,
+)
+
+# Despacho directo de herramientas MCP: en lugar de que fastapi-mcp convierta cada llamada
+# en una petición HTTP interna contra nuestras propias rutas (construir la petición, enrutar,
+# resolver dependencias, serializar y volver a parsear el JSON), las herramientas conocidas
+# se validan con los mismos modelos Pydantic y se mapean directamente a los controladores.
+# Las herramientas sin handler propio siguen usando el camino HTTP de fastapi-mcp.
+# Todas las llamadas, directas o no, pasan por la clase `mcp` del control de admisión.
+
+MCP_DIRECT_DISPATCH = os.getenv('MCP_DIRECT_DISPATCH', '1').lower() in ('1', 'true', 'yes', 'si')
+
+
+class PreSerialized(str):
+    """Resultado de un handler que ya es el texto JSON final y se devuelve tal cual."""
+
+
+# Modelos de argumentos para las herramientas que reciben parámetros de ruta o query
+class ComponenteIdArgs(BaseModel):
+    componente_id: int
+
+
+class BuscarArgs(BaseModel):
+    query: str = Field(..., min_length=1)
+
+
+class EstadisticasArgs(BaseModel):
+    agrupar_por: Literal["tipo", "tienda", "socket"] = "tipo"
+    campo: Literal["precio", "consumo", "potencia"] = "precio"
+    percentiles: List[float] = [25, 50, 75]
+    tipo: Optional[str] = None
+    tienda: Optional[str] = None
+    socket: Optional[str] = None
+
+
+# Las lecturas que van a la BD son corrutinas para compartir la coalescencia con las rutas HTTP
+async def _listar(arguments: Dict[str, Any]):
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        # Mismo formato (indent=2) que el resto de resultados, cacheado por versión del snapshot
+        text = await run_in_threadpool(get_all_componentes_snapshot_logic, snapshot, 2, True)
+        return PreSerialized(text)
+    return (await coalesced_read("listar", get_all_componentes_logic)).value
+
+
+async def _obtener(arguments: Dict[str, Any]):
+    args = ComponenteIdArgs.model_validate(arguments)
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return get_componente_by_id_snapshot_logic(snapshot, args.componente_id)
+    return (await coalesced_read("obtener", get_componente_by_id_logic, args.componente_id)).value
+
+
+async def _buscar(arguments: Dict[str, Any]):
+    args = BuscarArgs.model_validate(arguments)
+    return (await coalesced_read("buscar", search_componentes_by_name_logic, args.query)).value
+
+
+def _estadisticas(arguments: Dict[str, Any]):
+    args = EstadisticasArgs.model_validate(arguments)
+    filtros = {k: v for k, v in (("tipo", args.tipo), ("tienda", args.tienda), ("socket", args.socket)) if v is not None}
+    store = catalog_stats.get_store(db_conn)
+    return get_componentes_stats_logic(store, args.agrupar_por, args.campo, args.percentiles, filtros)
+
+
+def _crear(arguments: Dict[str, Any]):
+    componente_data = ComponenteCreate.model_validate(arguments)
+    with db_conn() as conn, coalescer.write_barrier():
+        componente = create_componente_logic(conn, componente_data.model_dump(exclude_none=True))
+        after_componente_written(conn, componente)
+        return componente
+
+
+def _actualizar(arguments: Dict[str, Any]):
+    arguments = dict(arguments)
+    args = ComponenteIdArgs.model_validate({"componente_id": arguments.pop("componente_id", None)})
+    update_data = ComponenteUpdate.model_validate(arguments).model_dump(exclude_unset=True)
+    if not update_data:
+        raise HTTPException(status_code=400, detail="No hay datos para actualizar. El cuerpo de la solicitud está vacío o solo contiene campos no configurados.")
+    with db_conn() as conn, coalescer.write_barrier():
+        componente = update_componente_logic(conn, args.componente_id, update_data)
+        after_componente_written(conn, componente)
+        return componente
+
+
+def _eliminar(arguments: Dict[str, Any]):
+    args = ComponenteIdArgs.model_validate(arguments)
+    with db_conn() as conn, coalescer.write_barrier():
+        result = delete_componente_logic(conn, args.componente_id)
+        after_componente_deleted(conn, args.componente_id)
+        return result
+
+
+# Nombre de la herramienta (operation_id de la ruta) -> handler (síncrono o corrutina)
+DIRECT_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "listar_todos_los_componentes": _listar,
+    "obtener_detalles_componente_por_id": _obtener,
+    "buscar_componente_por_nombre": _buscar,
+    "estadisticas_componentes": _estadisticas,
+    "crear_componente": _crear,
+    "actualizar_componente": _actualizar,
+    "eliminar_componente": _eliminar,
+}
+
+
+class DirectDispatchMCP(FastApiMCP):
+    """FastApiMCP que ejecuta las herramientas de componentes en proceso, sin petición HTTP interna.
+
+    Con `direct=False` todas las herramientas usan el camino HTTP de fastapi-mcp, pero siguen
+    sujetas al control de admisión.
+    """
+
+    def __init__(self, *args, direct: bool = True, **kwargs):
+        self.direct = direct
+        super().__init__(*args, **kwargs)
+
+    async def _execute_api_tool(
+        self,
+        client,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        operation_map: Dict[str, Dict[str, Any]],
+        http_request_info=None,
+    ) -> List[Union[types.TextContent, types.ImageContent, types.EmbeddedResource]]:
+        try:
+            async with admission.admit("mcp", classify_tool(tool_name)):
+                with mcp_internal_call():
+                    return await self._dispatch(client, tool_name, arguments, operation_map, http_request_info)
+        except AdmissionRejected as e:
+            raise Exception(
+                f"Error calling {tool_name}. Status code: 503. Retry-After: {e.retry_after}. Response: {json.dumps({'detail': str(e)}, ensure_ascii=False)}"
+            )
+
+    async def _dispatch(self, client, tool_name, arguments, operation_map, http_request_info):
+        handler = DIRECT_HANDLERS.get(tool_name) if self.direct else None
+        if handler is None:
+            return await super()._execute_api_tool(client, tool_name, arguments, operation_map, http_request_info)
+
+        try:
+            if inspect.iscoroutinefunction(handler):
+                result = await handler(arguments or {})
+            else:
+                # Los controladores son síncronos (mysql.connector), así que no bloqueamos el event loop
+                result = await run_in_threadpool(handler, arguments or {})
+        except HTTPException as e:
+            raise Exception(
+                f"Error calling {tool_name}. Status code: {e.status_code}. Response: {json.dumps({'detail': e.detail}, ensure_ascii=False)}"
+            )
+        except ValidationError as e:
+            raise Exception(
+                f"Error calling {tool_name}. Status code: 422. Response: {json.dumps({'detail': jsonable_encoder(e.errors())}, ensure_ascii=False)}"
+            )
+
+        # Mismo formato de texto que produce fastapi-mcp a partir de la respuesta HTTP.
+        # json.dumps con `default` evita el recorrido recursivo de jsonable_encoder sobre listas grandes.
+        if isinstance(result, PreSerialized):
+            result_text = str(result)
+        else:
+            result_text = json.dumps(result, indent=2, ensure_ascii=False, default=json_default)
+        return [types.TextContent(type="text", text=result_text)]
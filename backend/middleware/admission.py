@@ -0,0 +1,273 @@
+import os
+import math
+import time
+import heapq
+import asyncio
+import itertools
+from contextvars import ContextVar
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Any, Optional, Tuple
+
+# Control de admisión y descarte de carga (load shedding) para proteger MariaDB ante ráfagas.
+#
+# Cada clase de ruta (lecturas, escrituras, llamadas a herramientas MCP) tiene un límite de
+# concurrencia, una cola de espera acotada y un plazo máximo de espera. Si la cola está llena
+# o la espera estimada supera el plazo, la petición se rechaza de inmediato con 503 y
+# `Retry-After` en lugar de acumularse hasta que todo expire a la vez. Dentro de una clase
+# la cola es por prioridad: las búsquedas puntuales por ID pasan antes que los listados completos.
+#
+# Los límites son por proceso (cada worker de uvicorn tiene los suyos).
+
+PRIORIDAD_PUNTUAL = 0   # lookup por ID, estadísticas en memoria
+PRIORIDAD_BUSQUEDA = 1  # LIKE sobre `modelo`
+PRIORIDAD_ESCANEO = 2   # listado completo de la tabla
+
+_EWMA_ALPHA = 0.2
+
+
+def _env_limit(nombre: str, tipo, por_defecto, valido):
+    valor = os.getenv(nombre)
+    if valor is None:
+        return por_defecto
+    try:
+        convertido = tipo(valor)
+    except ValueError:
+        convertido = None
+    if convertido is None or not valido(convertido):
+        print(f"ADVERTENCIA: Valor no válido {nombre}={valor!r}; se usa {por_defecto}.")
+        return por_defecto
+    return convertido
+
+
+def _env_limits(clase: str, concurrencia: int, cola: int, espera: float) -> Tuple[int, int, float]:
+    # Concurrencia >= 1 (con 0 no se admitiría nada y la espera estimada dividiría por cero),
+    # cola >= 0 (0 = sin cola, se descarta en cuanto no hay hueco) y espera > 0
+    prefijo = f"ADMISION_{clase.upper()}"
+    return (
+        _env_limit(f"{prefijo}_CONCURRENCIA", int, concurrencia, lambda v: v >= 1),
+        _env_limit(f"{prefijo}_COLA", int, cola, lambda v: v >= 0),
+        _env_limit(f"{prefijo}_ESPERA", float, espera, lambda v: v > 0 and math.isfinite(v)),
+    )
+
+
+# clase -> (concurrencia máxima, tamaño máximo de cola, espera máxima en segundos)
+LIMITES = {
+    "lecturas": _env_limits("lecturas", 16, 64, 2.0),
+    "escrituras": _env_limits("escrituras", 4, 16, 5.0),
+    "mcp": _env_limits("mcp", 8, 32, 5.0),
+}
+
+
+class AdmissionRejected(Exception):
+    """La petición se descarta; `retry_after` es la sugerencia en segundos para el cliente."""
+
+    def __init__(self, clase: str, motivo: str, retry_after: int):
+        super().__init__(f"Servidor saturado ({clase}: {motivo}). Reintenta en {retry_after} s.")
+        self.clase = clase
+        self.motivo = motivo
+        self.retry_after = retry_after
+
+
+class ClassLimiter:
+    """Semáforo con cola por prioridad, acotada y con plazo, para una clase de rutas."""
+
+    def __init__(self, nombre: str, concurrencia: int, cola: int, espera: float):
+        if concurrencia < 1 or cola < 0 or not espera > 0:
+            raise ValueError(f"Límites de admisión no válidos para {nombre}: concurrencia={concurrencia}, cola={cola}, espera={espera}")
+        self.nombre = nombre
+        self.concurrencia = concurrencia
+        self.cola = cola
+        self.espera = espera
+        self._en_curso = 0
+        self._esperando = 0
+        self._heap = []  # (prioridad, secuencia, future)
+        self._seq = itertools.count()
+        self._servicio_ewma: Optional[float] = None
+        self._espera_ewma = 0.0
+        self.counters = {
+            "admitidas": 0,
+            "encoladas": 0,
+            "rechazadas_cola_llena": 0,
+            "rechazadas_desplazadas": 0,
+            "rechazadas_plazo": 0,
+            "rechazadas_timeout": 0,
+            "max_en_cola": 0,
+        }
+
+    def _estimated_wait(self, por_delante: int) -> float:
+        servicio = self._servicio_ewma or 0.0
+        return (por_delante + 1) * servicio / self.concurrencia
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self._estimated_wait(self._esperando)))
+
+    def _reject(self, motivo: str, contador: str) -> AdmissionRejected:
+        self.counters[contador] += 1
+        return AdmissionRejected(self.nombre, motivo, self._retry_after())
+
+    async def acquire(self, prioridad: int) -> None:
+        if self._en_curso < self.concurrencia and self._esperando == 0:
+            self._en_curso += 1
+            self.counters["admitidas"] += 1
+            return
+
+        desplazada = None
+        if self._esperando >= self.cola:
+            # Cola llena: una petición más barata (p. ej. un lookup por ID) ocupa el sitio de la
+            # peor en espera (mayor (prioridad, secuencia), p. ej. el último listado completo)
+            desplazada = max(((p, seq, f) for p, seq, f in self._heap if not f.done()), key=lambda e: e[:2], default=None)
+            if desplazada is None or desplazada[0] <= prioridad:
+                raise self._reject("cola llena", "rechazadas_cola_llena")
+
+        # Descarte temprano: si con el tiempo de servicio observado no da tiempo, no se encola
+        por_delante = sum(1 for p, _, f in self._heap if p <= prioridad and not f.done())
+        if self._estimated_wait(por_delante) > self.espera:
+            raise self._reject("plazo de espera inalcanzable", "rechazadas_plazo")
+
+        if desplazada is not None:
+            desplazada[2].set_exception(self._reject("desplazada por una petición más prioritaria", "rechazadas_desplazadas"))
+            self._esperando -= 1
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (prioridad, next(self._seq), future))
+        self._esperando += 1
+        self.counters["encoladas"] += 1
+        self.counters["max_en_cola"] = max(self.counters["max_en_cola"], self._esperando)
+        inicio = time.monotonic()
+        try:
+            await asyncio.wait_for(future, timeout=self.espera)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # El hueco se concedió justo mientras expiraba: se devuelve
+                self.release(None)
+            else:
+                self._esperando -= 1
+                future.cancel()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._reject("tiempo de espera agotado", "rechazadas_timeout")
+        self._espera_ewma += _EWMA_ALPHA * ((time.monotonic() - inicio) - self._espera_ewma)
+        self.counters["admitidas"] += 1
+
+    def release(self, duracion: Optional[float]) -> None:
+        if duracion is not None:
+            if self._servicio_ewma is None:
+                self._servicio_ewma = duracion
+            else:
+                self._servicio_ewma += _EWMA_ALPHA * (duracion - self._servicio_ewma)
+        # Se cede el hueco directamente al siguiente en espera (en_curso no cambia)
+        while self._heap:
+            _, _, future = heapq.heappop(self._heap)
+            if not future.done():
+                self._esperando -= 1
+                future.set_result(None)
+                return
+        self._en_curso -= 1
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "concurrencia_max": self.concurrencia,
+            "cola_max": self.cola,
+            "espera_max_s": self.espera,
+            "en_curso": self._en_curso,
+            "en_cola": self._esperando,
+            "servicio_ms_ewma": round((self._servicio_ewma or 0.0) * 1000, 3),
+            "espera_ms_ewma": round(self._espera_ewma * 1000, 3),
+            **self.counters,
+        }
+
+
+class AdmissionController:
+    def __init__(self, limites: Dict[str, Tuple[int, int, float]]):
+        self.limiters = {clase: ClassLimiter(clase, *valores) for clase, valores in limites.items()}
+
+    @asynccontextmanager
+    async def admit(self, clase: str, prioridad: int = PRIORIDAD_PUNTUAL):
+        limiter = self.limiters[clase]
+        await limiter.acquire(prioridad)
+        inicio = time.monotonic()
+        try:
+            yield
+        finally:
+            limiter.release(time.monotonic() - inicio)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {clase: limiter.metrics() for clase, limiter in self.limiters.items()}
+
+
+admission = AdmissionController(LIMITES)
+
+
+def classify(method: str, path: str) -> Optional[Tuple[str, int]]:
+    """Clase y prioridad de una petición HTTP, o None si no está sujeta a control de admisión."""
+    if not path.startswith("/componentes"):
+        return None
+    if method in ("POST", "PUT", "PATCH", "DELETE"):
+        return "escrituras", PRIORIDAD_PUNTUAL
+    resto = path[len("/componentes"):].strip("/")
+    if resto == "":
+        return "lecturas", PRIORIDAD_ESCANEO
+    if resto.startswith("buscar"):
+        return "lecturas", PRIORIDAD_BUSQUEDA
+    return "lecturas", PRIORIDAD_PUNTUAL
+
+
+def classify_tool(tool_name: str) -> int:
+    """Prioridad de una herramienta MCP dentro de la clase `mcp`."""
+    if tool_name == "listar_todos_los_componentes":
+        return PRIORIDAD_ESCANEO
+    if tool_name == "buscar_componente_por_nombre":
+        return PRIORIDAD_BUSQUEDA
+    return PRIORIDAD_PUNTUAL
+
+
+# Marca las peticiones HTTP internas que fastapi-mcp hace para una herramienta ya admitida en la
+# clase `mcp`. A diferencia de una cabecera (p. ej. Host: apiserver), un cliente externo no puede
+# fijarla, y se propaga hasta la app porque httpx.ASGITransport la llama en la misma tarea.
+_llamada_mcp_interna: ContextVar[bool] = ContextVar("llamada_mcp_interna", default=False)
+
+
+@contextmanager
+def mcp_internal_call():
+    """Envuelve la ejecución de una herramienta MCP ya admitida para no contarla dos veces."""
+    token = _llamada_mcp_interna.set(True)
+    try:
+        yield
+    finally:
+        _llamada_mcp_interna.reset(token)
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI que aplica el control de admisión a las rutas de /componentes."""
+
+    def __init__(self, app, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        clasificacion = classify(scope["method"], scope["path"])
+        if clasificacion is None or _llamada_mcp_interna.get():
+            return await self.app(scope, receive, send)
+
+        clase, prioridad = clasificacion
+        try:
+            async with self.controller.admit(clase, prioridad):
+                await self.app(scope, receive, send)
+        except AdmissionRejected as e:
+            await _send_503(send, e)
+
+
+async def _send_503(send, error: AdmissionRejected):
+    body = ('{"detail": "%s"}' % str(error).replace('"', "'")).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(error.retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,224 @@
+"""
+Arnés de replay conversacional: mide la latencia de extremo a extremo de un turno del agente sin
+Ollama ni Anthropic. Un LLM local determinista (ScriptedLLM) sigue trazas ReAct guionizadas y las
+herramientas se ejecutan de verdad con MCPClient contra la API en marcha.
+
+Uso (desde la raíz del proyecto, con la API levantada: python -m backend.main):
+    python -m backend.replay.harness --sembrar                    # siembra el catálogo y reproduce todo
+    python -m backend.replay.harness --repeticiones 5 --json resultados.json
+    python -m backend.replay.harness --conversacion precio_rtx_4090 --verbose
+
+Por conversación se informa: llamadas a herramientas, bytes y tokens estimados devueltos al modelo
+(caracteres / 4), tamaño final del prompt y tiempo de reloj (total y solo herramientas).
+"""
+import io
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+import contextlib
+
+import requests
+
+from backend.mcp_client import MCPClient
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+TRAZAS_POR_DEFECTO = os.path.join(DIRECTORIO, "conversaciones.json")
+SEMILLA_POR_DEFECTO = os.path.join(DIRECTORIO, "catalogo_semilla.json")
+
+# Mismo formato que el prompt ReAct (zero-shot) de los agentes de ollama_client.py y claude.py
+PROMPT_REACT = """Answer the following questions as best you can. You have access to the following tools:
+
+{herramientas}
+
+Use the following format:
+
+Question: the input question you must answer
+Thought: you should always think about what to do
+Action: the action to take, should be one of [{nombres}]
+Action Input: the input to the action
+Observation: the result of the action
+... (this Thought/Action/Action Input/Observation can repeat N times)
+Thought: I now know the final answer
+Final Answer: the final answer to the original input question
+
+Begin!
+
+Question: {pregunta}
+Thought:"""
+
+_RE_ACCION = re.compile(r"Action\s*:\s*(.*?)\s*\nAction\s*Input\s*:\s*(.*)", re.S)
+_RE_FINAL = re.compile(r"Final Answer\s*:\s*(.*)", re.S)
+_RE_ID = re.compile(r'"id"\s*:\s*(\d+)')
+
+
+def estimar_tokens(texto: str) -> int:
+    # Aproximación habitual para modelos tipo GPT/Llama: ~4 caracteres por token
+    return (len(texto) + 3) // 4
+
+
+class ScriptedLLM:
+    """LLM determinista: devuelve, en orden, los pasos de una traza ReAct guionizada.
+
+    Los pasos pueden usar `{primer_id}`, que se sustituye por el primer `"id": N` de la última
+    observación del prompt (p. ej. el ID devuelto por la búsqueda anterior).
+    """
+
+    def __init__(self, pasos):
+        self.pasos = list(pasos)
+        self.llamadas = 0
+
+    def invoke(self, prompt: str) -> str:
+        if self.llamadas >= len(self.pasos):
+            raise RuntimeError("La traza no tiene más pasos y el agente no llegó a una respuesta final.")
+        paso = self.pasos[self.llamadas]
+        self.llamadas += 1
+
+        ultima_observacion = prompt.rsplit("Observation:", 1)[-1] if "Observation:" in prompt else ""
+        encontrado = _RE_ID.search(ultima_observacion)
+        sustituir = lambda texto: texto.replace("{primer_id}", encontrado.group(1) if encontrado else "")
+
+        salida = f" {sustituir(paso.get('pensamiento', ''))}\n"
+        if "respuesta_final" in paso:
+            return salida + f"Final Answer: {sustituir(paso['respuesta_final'])}"
+        return salida + f"Action: {paso['accion']}\nAction Input: {sustituir(paso.get('entrada', ''))}"
+
+
+def reproducir(llm: ScriptedLLM, herramientas, pregunta: str, max_pasos: int = 10) -> dict:
+    """Bucle ReAct mínimo (el mismo contrato que el agente ZERO_SHOT_REACT_DESCRIPTION)."""
+    por_nombre = {tool.name: tool for tool in herramientas}
+    prompt = PROMPT_REACT.format(
+        herramientas="\n".join(f"{tool.name}: {tool.description}" for tool in herramientas),
+        nombres=", ".join(por_nombre),
+        pregunta=pregunta,
+    )
+    metricas = {
+        "llamadas_herramientas": 0,
+        "bytes_devueltos": 0,
+        "tokens_devueltos": 0,
+        "tokens_prompt_inicial": estimar_tokens(prompt),
+        "tiempo_herramientas_ms": 0.0,
+        "respuesta": None,
+        "errores": [],
+    }
+
+    inicio = time.perf_counter()
+    for _ in range(max_pasos):
+        salida = llm.invoke(prompt)
+        final = _RE_FINAL.search(salida)
+        if final:
+            metricas["respuesta"] = final.group(1).strip()
+            break
+
+        accion = _RE_ACCION.search(salida)
+        if accion is None:
+            observacion = "Invalid Format: Missing 'Action:' after 'Thought:'"
+        else:
+            nombre, entrada = accion.group(1).strip(), accion.group(2).strip()
+            tool = por_nombre.get(nombre)
+            if tool is None:
+                observacion = f"{nombre} is not a valid tool, try one of [{', '.join(por_nombre)}]."
+            else:
+                inicio_tool = time.perf_counter()
+                observacion = tool.func(entrada)
+                metricas["tiempo_herramientas_ms"] += (time.perf_counter() - inicio_tool) * 1000
+                metricas["llamadas_herramientas"] += 1
+                metricas["bytes_devueltos"] += len(observacion.encode("utf-8"))
+                metricas["tokens_devueltos"] += estimar_tokens(observacion)
+            if observacion.startswith("Error"):
+                metricas["errores"].append(observacion[:200])
+
+        prompt += f"{salida}\nObservation: {observacion}\nThought:"
+    else:
+        metricas["errores"].append(f"Sin respuesta final tras {max_pasos} pasos.")
+
+    metricas["tiempo_total_ms"] = (time.perf_counter() - inicio) * 1000
+    metricas["tokens_prompt_final"] = estimar_tokens(prompt)
+    return metricas
+
+
+def sembrar_catalogo(api_url: str, ruta: str):
+    """Inserta el catálogo semilla por la API REST; los que ya existen (409) se ignoran."""
+    with open(ruta, encoding="utf-8") as f:
+        componentes = json.load(f)
+    creados = existentes = 0
+    for componente in componentes:
+        respuesta = requests.post(f"{api_url}/componentes/", json=componente, timeout=10)
+        if respuesta.status_code == 409:
+            existentes += 1
+            continue
+        respuesta.raise_for_status()
+        creados += 1
+    print(f"Catálogo semilla: {creados} creados, {existentes} ya existían.")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Reproduce conversaciones ReAct guionizadas contra la API y mide su latencia")
+    parser.add_argument("--api", default="http://127.0.0.1:8000", help="URL base de la API (el servidor MCP está en /mcp)")
+    parser.add_argument("--trazas", default=TRAZAS_POR_DEFECTO, help="Fichero JSON con las conversaciones guionizadas")
+    parser.add_argument("--conversacion", action="append", help="Reproduce solo esta conversación (se puede repetir)")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Veces que se reproduce cada conversación")
+    parser.add_argument("--sembrar", action="store_true", help="Siembra antes el catálogo de prueba vía POST /componentes/")
+    parser.add_argument("--semilla", default=SEMILLA_POR_DEFECTO, help="Fichero JSON con el catálogo semilla")
+    parser.add_argument("--json", dest="salida_json", help="Guarda los resultados detallados en este fichero")
+    parser.add_argument("--verbose", action="store_true", help="Muestra los logs de MCPClient")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    api_url = args.api.rstrip("/")
+    if args.sembrar:
+        sembrar_catalogo(api_url, args.semilla)
+
+    with open(args.trazas, encoding="utf-8") as f:
+        conversaciones = json.load(f)
+    if args.conversacion:
+        conversaciones = [c for c in conversaciones if c["nombre"] in args.conversacion]
+
+    # MCPClient escribe mucho por stdout; sin --verbose se descarta para no falsear la tabla
+    silenciar = contextlib.nullcontext if args.verbose else lambda: contextlib.redirect_stdout(io.StringIO())
+
+    resultados = []
+    for conversacion in conversaciones:
+        for repeticion in range(args.repeticiones):
+            # Una sesión MCP por conversación, como cada ejecución del agente
+            inicio = time.perf_counter()
+            with silenciar():
+                cliente = MCPClient(f"{api_url}/mcp")
+            conexion_ms = (time.perf_counter() - inicio) * 1000
+            if not cliente.session_id:
+                cliente.close()
+                raise SystemExit(f"No se pudo abrir la sesión MCP en {api_url}/mcp. ¿Está la API en marcha?")
+            try:
+                with silenciar():
+                    metricas = reproducir(ScriptedLLM(conversacion["pasos"]), cliente.get_tools(), conversacion["pregunta"])
+            finally:
+                cliente.close()
+            resultados.append({"nombre": conversacion["nombre"], "repeticion": repeticion, "conexion_ms": conexion_ms, **metricas})
+            for error in metricas["errores"]:
+                print(f"[{conversacion['nombre']}] {error}")
+
+    print(f"\n{'conversación':<42}{'tools':>6}{'bytes':>10}{'tokens':>8}{'prompt':>8}{'conexión ms':>13}{'tools ms':>10}{'total ms':>10}")
+    for conversacion in conversaciones:
+        filas = [r for r in resultados if r["nombre"] == conversacion["nombre"]]
+        if not filas:
+            continue
+        mediana = lambda campo: statistics.median(r[campo] for r in filas)
+        print(f"{conversacion['nombre']:<42}{filas[0]['llamadas_herramientas']:>6}{filas[0]['bytes_devueltos']:>10}"
+              f"{filas[0]['tokens_devueltos']:>8}{filas[0]['tokens_prompt_final']:>8}{mediana('conexion_ms'):>13.1f}"
+              f"{mediana('tiempo_herramientas_ms'):>10.1f}{mediana('tiempo_total_ms'):>10.1f}")
+    print(f"(tiempos: mediana de {args.repeticiones} repeticiones; tokens estimados como caracteres / 4)")
+
+    if args.salida_json:
+        with open(args.salida_json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"Resultados guardados en {args.salida_json}")
+    return 1 if any(r["errores"] for r in resultados) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,22 @@
 from fastapi import APIRouter, HTTPException, Depends, Body, status, Query # Añadir Query
-from typing import List, Dict, Any, Optional # Añadir Optional
+from fastapi.responses import Response
+from typing import List, Dict, Any, Optional, Literal # Añadir Optional
 from pydantic import BaseModel, Field, field_validator # Añadir BaseModel y Field
+from contextlib import contextmanager
+from starlette.concurrency import run_in_threadpool
 import mysql.connector # Para tipado de la conexión
 
 # Importamos la función para crear la conexión y las funciones del controlador
-from backend.db.connection import create_db_connection
+from backend.db.connection import create_db_connection, close_db_connection
+from backend.db.catalog_snapshot import get_snapshot, refresh_snapshot
+from backend.db import catalog_stats
+from backend.controllers.coalescing import coalescer
 from backend.controllers.componentes_controller import (
     get_all_componentes_logic,
     get_componente_by_id_logic,
+    get_all_componentes_snapshot_logic,
+    get_componente_by_id_snapshot_logic,
+    get_componentes_stats_logic,
     update_componente_logic,
     delete_componente_logic,
     create_componente_logic,
@@ -66,31 +75,87 @@ class ComponenteUpdate(BaseModel):
     class Config:
         anystr_strip_whitespace = True
 
-# Función de dependencia para obtener y cerrar la conexión a la BD
-async def get_db_conn():
+# Abre una conexión a la BD y la cierra al terminar (usado por la dependencia y por las lecturas con snapshot)
+@contextmanager
+def db_conn():
     conn = create_db_connection()
     if conn is None or not conn.is_connected():
+        close_db_connection(conn)
         raise HTTPException(status_code=503, detail="No se pudo conectar a la base de datos.")
     try:
         yield conn
     finally:
-        if conn and conn.is_connected():
-            conn.close()
-            print("Conexión a MariaDB cerrada desde get_db_conn")
-
+        # Siempre, aunque la conexión se haya caído: es lo único que la devuelve al pool
+        close_db_connection(conn)
+        print("Conexión a MariaDB cerrada desde db_conn")
 
-@router.get("/", response_model=List[Dict[str, Any]])
-async def get_componentes_route(conn: mysql.connector.MySQLConnection = Depends(get_db_conn)):
-    return get_all_componentes_logic(conn)
-
-@router.get("/{componente_id}", response_model=Dict[str, Any])
-async def get_componente_route(componente_id: int, conn: mysql.connector.MySQLConnection = Depends(get_db_conn)):
-    return get_componente_by_id_logic(conn, componente_id)
+# Función de dependencia para obtener y cerrar la conexión a la BD
+async def get_db_conn():
+    with db_conn() as conn:
+        yield conn
 
-@router.get("/buscar/", response_model=List[Dict[str, Any]], tags=["Componentes"])
+# Ejecuta una función del controlador con su propia conexión (pensado para el threadpool)
+def run_with_conn(logic, *args, **kwargs):
+    with db_conn() as conn:
+        return logic(conn, *args, **kwargs)
+
+# Lectura coalescida: peticiones idénticas concurrentes comparten una ejecución y su JSON
+async def coalesced_read(nombre: str, logic, *args):
+    return await coalescer.run(nombre, args, lambda: run_with_conn(logic, *args))
+
+def _json_response(resultado) -> Response:
+    return Response(content=resultado.body, media_type="application/json")
+
+# Mantienen el snapshot y las estadísticas al día tras una escritura (compartido con mcp_dispatch)
+def after_componente_written(conn, componente: Dict[str, Any]):
+    publicado = refresh_snapshot(conn)
+    catalog_stats.apply_upsert(componente, publicado)
+
+def after_componente_deleted(conn, componente_id: int):
+    publicado = refresh_snapshot(conn)
+    catalog_stats.apply_delete(componente_id, publicado)
+
+
+@router.get("/", response_model=List[Dict[str, Any]], operation_id="listar_todos_los_componentes")
+async def get_componentes_route():
+    # Si hay snapshot compartido entre workers se sirve desde él sin tocar la BD
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        # La primera petición de cada versión genera el JSON (fuera del event loop); las demás lo reutilizan
+        body = await run_in_threadpool(get_all_componentes_snapshot_logic, snapshot)
+        return Response(content=body, media_type="application/json")
+    return _json_response(await coalesced_read("listar", get_all_componentes_logic))
+
+@router.get("/stats", response_model=Dict[str, Any], operation_id="estadisticas_componentes")
+async def get_componentes_stats_route(
+    agrupar_por: Literal["tipo", "tienda", "socket"] = Query("tipo", description="Columna por la que se agrupan los componentes"),
+    campo: Literal["precio", "consumo", "potencia"] = Query("precio", description="Columna numérica sobre la que se calculan las estadísticas"),
+    percentiles: List[float] = Query([25, 50, 75], description="Percentiles a calcular (0-100), p. ej. 50 para la mediana"),
+    tipo: Optional[str] = Query(None, description="Filtrar por tipo exacto (p. ej. GPU)"),
+    tienda: Optional[str] = Query(None, description="Filtrar por tienda exacta"),
+    socket: Optional[str] = Query(None, description="Filtrar por socket exacto"),
+):
+    """
+    Estadísticas del catálogo (count, min, max, mean y percentiles) de precio, consumo o potencia,
+    agrupadas por tipo, tienda o socket. Usa esta herramienta para preguntas como
+    "precio mediano de las GPU por tienda" en lugar de listar todos los componentes.
+    Los valores NULL no se cuentan.
+    """
+    filtros = {k: v for k, v in (("tipo", tipo), ("tienda", tienda), ("socket", socket)) if v is not None}
+    # La (re)carga del almacén puede tardar con catálogos grandes: fuera del event loop
+    store = await run_in_threadpool(catalog_stats.get_store, db_conn)
+    return get_componentes_stats_logic(store, agrupar_por, campo, percentiles, filtros)
+
+@router.get("/{componente_id}", response_model=Dict[str, Any], operation_id="obtener_detalles_componente_por_id")
+async def get_componente_route(componente_id: int):
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return get_componente_by_id_snapshot_logic(snapshot, componente_id)
+    return _json_response(await coalesced_read("obtener", get_componente_by_id_logic, componente_id))
+
+@router.get("/buscar/", response_model=List[Dict[str, Any]], tags=["Componentes"], operation_id="buscar_componente_por_nombre")
 async def buscar_componente_por_nombre(
     query: str = Query(..., description="Término de búsqueda para el nombre o modelo del componente", min_length=1),
-    conn: mysql.connector.MySQLConnection = Depends(get_db_conn)
 ):
     """
     Busca componentes por su nombre o modelo.
@@ -98,16 +163,16 @@ async def buscar_componente_por_nombre(
     """
     # La función search_componentes_by_name_logic espera un parámetro 'nombre'.
     # Mapeamos el parámetro 'query' de la ruta al parámetro 'nombre' del controlador.
-    resultados = search_componentes_by_name_logic(conn, nombre=query)
-    if not resultados:
+    resultados = await coalesced_read("buscar", search_componentes_by_name_logic, query)
+    if not resultados.value:
         # Aunque la lógica del controlador puede devolver una lista vacía (lo cual es correcto),
         # podrías querer que la API devuelva 404 si no hay resultados,
         # o simplemente una lista vacía (actualmente devuelve lista vacía).
         # Por consistencia con otras búsquedas, devolver una lista vacía está bien.
         pass
-    return resultados
+    return _json_response(resultados)
 
-@router.post("/", response_model=Dict[str, Any], status_code=status.HTTP_201_CREATED)
+@router.post("/", response_model=Dict[str, Any], status_code=status.HTTP_201_CREATED, operation_id="crear_componente")
 async def create_componente_route(
     componente_data: ComponenteCreate, # Usa el modelo Pydantic para validación
     conn: mysql.connector.MySQLConnection = Depends(get_db_conn)
@@ -119,10 +184,14 @@ async def create_componente_route(
     # Convertir el modelo Pydantic a un diccionario para el controlador
     # exclude_unset=True es importante si quieres que los valores no enviados no se pasen como None
     # pero para la creación, usualmente queremos pasar todos los valores definidos (o sus defaults).
-    return create_componente_logic(conn, componente_data.model_dump(exclude_none=True))
+    with coalescer.write_barrier():
+        componente = create_componente_logic(conn, componente_data.model_dump(exclude_none=True))
+    # Regenerar el snapshot (SELECT completo, escritura, fsync y espera del lock) bloquea: fuera del event loop
+    await run_in_threadpool(after_componente_written, conn, componente)
+    return componente
 
 
-@router.put("/{componente_id}", response_model=Dict[str, Any])
+@router.put("/{componente_id}", response_model=Dict[str, Any], operation_id="actualizar_componente")
 async def update_componente_route(
     componente_id: int,
     componente_data: ComponenteUpdate, # Usa el modelo Pydantic para validación de actualización
@@ -138,9 +207,12 @@ async def update_componente_route(
     update_data = componente_data.model_dump(exclude_unset=True)
     if not update_data:
         raise HTTPException(status_code=400, detail="No hay datos para actualizar. El cuerpo de la solicitud está vacío o solo contiene campos no configurados.")
-    return update_componente_logic(conn, componente_id, update_data)
+    with coalescer.write_barrier():
+        componente = update_componente_logic(conn, componente_id, update_data)
+    await run_in_threadpool(after_componente_written, conn, componente)
+    return componente
 
-@router.delete("/{componente_id}", status_code=status.HTTP_200_OK)
+@router.delete("/{componente_id}", status_code=status.HTTP_200_OK, operation_id="eliminar_componente")
 async def delete_componente_route(
     componente_id: int,
     conn: mysql.connector.MySQLConnection = Depends(get_db_conn)
@@ -148,5 +220,7 @@ async def delete_componente_route(
     """
     Elimina un componente por su ID.
     """
-    result = delete_componente_logic(conn, componente_id)
+    with coalescer.write_barrier():
+        result = delete_componente_logic(conn, componente_id)
+    await run_in_threadpool(after_componente_deleted, conn, componente_id)
     return result # Devuelve el mensaje de éxito del controlador
\ No newline at end of file
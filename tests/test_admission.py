@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from backend.middleware.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    PRIORIDAD_ESCANEO,
+    PRIORIDAD_PUNTUAL,
+)
+
+
+async def _peticion(controller, nombre, prioridad, eventos, liberar):
+    try:
+        async with controller.admit("lecturas", prioridad):
+            eventos.append(nombre)
+            await liberar.wait()
+    except AdmissionRejected:
+        eventos.append(f"{nombre}:503")
+
+
+def test_full_queue_point_lookup_displaces_queued_scan():
+    async def main():
+        controller = AdmissionController({"lecturas": (1, 1, 5.0)})
+        eventos, liberar = [], asyncio.Event()
+        a = asyncio.ensure_future(_peticion(controller, "a", PRIORIDAD_PUNTUAL, eventos, liberar))
+        await asyncio.sleep(0)
+        b = asyncio.ensure_future(_peticion(controller, "b", PRIORIDAD_ESCANEO, eventos, liberar))
+        await asyncio.sleep(0)
+        c = asyncio.ensure_future(_peticion(controller, "c", PRIORIDAD_PUNTUAL, eventos, liberar))
+        await asyncio.sleep(0.01)
+        liberar.set()
+        await asyncio.gather(a, b, c)
+
+        assert eventos == ["a", "b:503", "c"]
+        metricas = controller.metrics()["lecturas"]
+        assert metricas["rechazadas_desplazadas"] == 1
+        assert metricas["en_curso"] == 0 and metricas["en_cola"] == 0
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("prioridad_nueva", [PRIORIDAD_ESCANEO, PRIORIDAD_PUNTUAL])
+def test_full_queue_rejects_newcomer_without_higher_priority(prioridad_nueva):
+    async def main():
+        controller = AdmissionController({"lecturas": (1, 1, 5.0)})
+        eventos, liberar = [], asyncio.Event()
+        en_cola = PRIORIDAD_ESCANEO if prioridad_nueva == PRIORIDAD_ESCANEO else PRIORIDAD_PUNTUAL
+        a = asyncio.ensure_future(_peticion(controller, "a", PRIORIDAD_PUNTUAL, eventos, liberar))
+        await asyncio.sleep(0)
+        b = asyncio.ensure_future(_peticion(controller, "b", en_cola, eventos, liberar))
+        await asyncio.sleep(0)
+        c = asyncio.ensure_future(_peticion(controller, "c", prioridad_nueva, eventos, liberar))
+        await asyncio.sleep(0.01)
+        liberar.set()
+        await asyncio.gather(a, b, c)
+
+        assert eventos == ["a", "c:503", "b"]
+        assert controller.metrics()["lecturas"]["rechazadas_cola_llena"] == 1
+
+    asyncio.run(main())
+
+
+def test_zero_queue_sheds_immediately():
+    async def main():
+        controller = AdmissionController({"lecturas": (1, 0, 5.0)})
+        eventos, liberar = [], asyncio.Event()
+        a = asyncio.ensure_future(_peticion(controller, "a", PRIORIDAD_ESCANEO, eventos, liberar))
+        await asyncio.sleep(0)
+        await _peticion(controller, "b", PRIORIDAD_PUNTUAL, eventos, liberar)
+        liberar.set()
+        await a
+        assert eventos == ["a", "b:503"]
+
+    asyncio.run(main())
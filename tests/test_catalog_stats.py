@@ -0,0 +1,184 @@
+import random
+
+import numpy as np
+import pytest
+
+from fastapi import HTTPException
+
+from backend.controllers.componentes_controller import get_componentes_stats_logic
+from backend.db import catalog_snapshot, catalog_stats
+from backend.db.catalog_stats import CatalogStats
+
+AGRUPACIONES = ("tipo", "tienda", "socket")
+CAMPOS = ("precio", "consumo")
+
+
+def _componente(rng: random.Random, componente_id: int) -> dict:
+    return {
+        "id": componente_id,
+        "tipo": rng.choice(["GPU", "CPU", "RAM", None]),
+        "modelo": f"Modelo {componente_id}",
+        # Valores repetidos a propósito para ejercitar los empates en searchsorted
+        "precio": rng.choice([None, 100.0, 250.0, round(rng.uniform(1, 1000), 2)]),
+        "tienda": rng.choice(["Amazon", "DDTech", "Cyberpuerta"]),
+        "url": None,
+        "consumo": rng.choice([None, 65, 125]),
+        "socket": rng.choice(["AM5", "LGA1700", None]),
+        "rams": None,
+        "potencia": None,
+        "img": None,
+    }
+
+
+def _assert_matches(store: CatalogStats, filas: dict) -> None:
+    """Compara group_stats con el cálculo directo sobre las filas (mismo criterio que np.percentile)."""
+    for agrupar_por in AGRUPACIONES:
+        for campo in CAMPOS:
+            for filtros in ({}, {"tienda": "Amazon"}):
+                esperado = {}
+                for fila in filas.values():
+                    if fila[campo] is None or any(fila[k] != v for k, v in filtros.items()):
+                        continue
+                    esperado.setdefault(fila[agrupar_por], []).append(fila[campo])
+
+                grupos = store.group_stats(agrupar_por, campo, [50, 90], filtros)
+                assert {g["grupo"] for g in grupos} == set(esperado)
+                for g in grupos:
+                    valores = esperado[g["grupo"]]
+                    assert g["count"] == len(valores)
+                    assert g["min"] == min(valores) and g["max"] == max(valores)
+                    assert g["mean"] == pytest.approx(np.mean(valores))
+                    assert g["p50"] == pytest.approx(np.percentile(valores, 50))
+                    assert g["p90"] == pytest.approx(np.percentile(valores, 90))
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog_snapshot, "SNAPSHOT_ENABLED", True)
+    monkeypatch.setattr(catalog_snapshot, "SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(catalog_snapshot, "_current", None)
+    monkeypatch.setattr(catalog_snapshot, "_current_key", None)
+    return tmp_path
+
+
+def test_incremental_upkeep_matches_full_recompute(snapshot_dir):
+    rng = random.Random(7)
+    filas = {i: _componente(rng, i) for i in range(1, 401)}
+    catalog_snapshot.publish_snapshot(list(filas.values()))
+    store = CatalogStats()
+    store.load_from_snapshot(catalog_snapshot.get_snapshot())
+    _assert_matches(store, filas)  # llena la caché de órdenes antes de las escrituras
+
+    siguiente = 1000
+    for paso in range(300):
+        operacion = rng.random()
+        if operacion < 0.35:
+            filas[siguiente] = _componente(rng, siguiente)
+            store.upsert(filas[siguiente])
+            siguiente += 1
+        elif operacion < 0.7:
+            componente_id = rng.choice(list(filas))
+            filas[componente_id] = _componente(rng, componente_id)
+            store.upsert(filas[componente_id])
+        else:
+            # Swap-remove: la última fila pasa a ocupar el hueco y debe re-indexarse
+            componente_id = rng.choice(list(filas))
+            del filas[componente_id]
+            store.delete(componente_id)
+        if paso % 25 == 0:
+            _assert_matches(store, filas)
+
+    _assert_matches(store, filas)
+    for entry in store._order_cache.values():
+        order, codes, values = entry
+        assert len(order) == len(set(order.tolist()))
+        assert (np.diff(codes) >= 0).all()
+
+
+def test_delete_of_last_row_and_missing_id(snapshot_dir):
+    store = CatalogStats()
+    filas = {
+        1: {"id": 1, "tipo": "GPU", "tienda": "A", "socket": None, "precio": 10.0, "consumo": None, "potencia": None},
+        2: {"id": 2, "tipo": "GPU", "tienda": "A", "socket": None, "precio": 20.0, "consumo": None, "potencia": None},
+    }
+    store.load(list(filas.values()))
+    _assert_matches(store, filas)
+    store.delete(2)
+    store.delete(99)
+    del filas[2]
+    _assert_matches(store, filas)
+
+
+def test_own_publish_does_not_drop_other_workers_writes(snapshot_dir, monkeypatch):
+    class FakeConn:
+        """Conexión mínima: build_snapshot_from_db solo hace un SELECT de la tabla completa."""
+
+        def __init__(self, filas):
+            self.filas = filas
+
+        def cursor(self, dictionary=False):
+            filas = self.filas
+
+            class Cursor:
+                def execute(self, sql):
+                    pass
+
+                def fetchall(self):
+                    return [dict(f) for f in filas.values()]
+
+                def close(self):
+                    pass
+
+            return Cursor()
+
+    rng = random.Random(3)
+    monkeypatch.setattr(catalog_stats, "_store", CatalogStats())
+    bd = {i: _componente(rng, i) for i in (1, 2)}
+    for fila in bd.values():
+        fila["precio"] = 100.0
+    conn = FakeConn(bd)
+
+    catalog_snapshot.build_snapshot_from_db(conn)
+    store = catalog_stats.get_store(conn_factory=None)
+    assert store.group_stats("tipo", "precio", [], {}) != []
+
+    # "Worker B" escribe y publica sin que este proceso lo vea
+    bd[3] = dict(_componente(rng, 3), precio=100.0)
+    catalog_snapshot.build_snapshot_from_db(conn)
+
+    # "Worker A" (este proceso) escribe, publica y aplica su propia escritura
+    bd[4] = dict(_componente(rng, 4), precio=100.0)
+    publicado = catalog_snapshot.build_snapshot_from_db(conn)
+    catalog_stats.apply_upsert(bd[4], publicado)
+
+    store = catalog_stats.get_store(conn_factory=None)
+    assert sum(g["count"] for g in store.group_stats("tipo", "precio", [], {})) == 4
+
+
+def test_own_publish_is_adopted_without_reload(snapshot_dir, monkeypatch):
+    rng = random.Random(5)
+    monkeypatch.setattr(catalog_stats, "_store", CatalogStats())
+    filas = {i: dict(_componente(rng, i), precio=50.0) for i in (1, 2)}
+    catalog_snapshot.publish_snapshot(list(filas.values()))
+    store = catalog_stats.get_store(conn_factory=None)
+    anterior = catalog_snapshot.get_snapshot().nombre
+
+    filas[3] = dict(_componente(rng, 3), precio=50.0)
+    version = catalog_snapshot.publish_snapshot(list(filas.values()))
+
+    recargas = []
+    monkeypatch.setattr(store, "load_from_snapshot", lambda snapshot: recargas.append(snapshot))
+    catalog_stats.apply_upsert(filas[3], (anterior, f"componentes.{version}.snap"))
+
+    assert recargas == []
+    assert store.source is catalog_snapshot.get_snapshot()
+    assert sum(g["count"] for g in store.group_stats("tipo", "precio", [], {})) == 3
+
+
+@pytest.mark.parametrize("percentil", [float("nan"), float("inf"), -1.0, 100.5])
+def test_stats_logic_rejects_invalid_percentiles(percentil):
+    store = CatalogStats()
+    store.load([{"id": 1, "tipo": "GPU", "tienda": "A", "socket": None, "precio": 10.0, "consumo": None, "potencia": None}])
+    with pytest.raises(HTTPException) as error:
+        get_componentes_stats_logic(store, "tipo", "precio", [50, percentil], {})
+    assert error.value.status_code == 400
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+
+import pytest
+
+from backend.controllers.coalescing import QueryCoalescer
+
+
+def _blocking_query(liberar: threading.Event, ejecuciones: list, valor):
+    def fn():
+        ejecuciones.append(valor)
+        liberar.wait(5)
+        return valor
+    return fn
+
+
+async def _wait_until(condicion):
+    for _ in range(500):
+        if condicion():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("La condición no se cumplió a tiempo")
+
+
+def test_identical_concurrent_reads_share_one_execution():
+    async def main():
+        coalescer = QueryCoalescer()
+        liberar, ejecuciones = threading.Event(), []
+        fn = _blocking_query(liberar, ejecuciones, [1, 2, 3])
+        tareas = [asyncio.ensure_future(coalescer.run("listar", (), fn)) for _ in range(10)]
+        await _wait_until(lambda: ejecuciones)
+        liberar.set()
+        resultados = await asyncio.gather(*tareas)
+        assert len(ejecuciones) == 1
+        assert all(r is resultados[0] for r in resultados)
+        assert coalescer.metrics() == {"ejecutadas": 1, "coalescidas": 9, "barreras_escritura": 0, "en_vuelo": 0}
+
+    asyncio.run(main())
+
+
+def test_leader_cancellation_does_not_cancel_joiners():
+    async def main():
+        coalescer = QueryCoalescer()
+        liberar, ejecuciones = threading.Event(), []
+        fn = _blocking_query(liberar, ejecuciones, {"id": 1})
+        lider = asyncio.ensure_future(coalescer.run("obtener", (1,), fn))
+        await _wait_until(lambda: ejecuciones)
+        seguidor = asyncio.ensure_future(coalescer.run("obtener", (1,), fn))
+        await asyncio.sleep(0)
+
+        lider.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await lider
+        liberar.set()
+
+        resultado = await seguidor
+        assert resultado.value == {"id": 1}
+        assert len(ejecuciones) == 1
+        assert coalescer.metrics()["en_vuelo"] == 0
+
+    asyncio.run(main())
+
+
+def test_read_after_write_barrier_does_not_join_older_execution():
+    async def main():
+        coalescer = QueryCoalescer()
+        liberar_antigua, ejecuciones = threading.Event(), []
+        antigua = asyncio.ensure_future(
+            coalescer.run("listar", (), _blocking_query(liberar_antigua, ejecuciones, "antes"))
+        )
+        await _wait_until(lambda: ejecuciones)
+
+        with coalescer.write_barrier():
+            pass
+
+        liberar_nueva = threading.Event()
+        liberar_nueva.set()
+        nueva = await coalescer.run("listar", (), _blocking_query(liberar_nueva, ejecuciones, "despues"))
+        assert nueva.value == "despues"
+
+        liberar_antigua.set()
+        assert (await antigua).value == "antes"
+        assert ejecuciones == ["antes", "despues"]
+        assert coalescer.metrics()["coalescidas"] == 0
+
+    asyncio.run(main())
+
+
+def test_failed_execution_propagates_to_every_waiter_and_is_not_cached():
+    async def main():
+        coalescer = QueryCoalescer()
+        liberar = threading.Event()
+
+        def falla():
+            liberar.wait(5)
+            raise RuntimeError("BD caída")
+
+        tareas = [asyncio.ensure_future(coalescer.run("buscar", ("rtx",), falla)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        liberar.set()
+        for resultado in await asyncio.gather(*tareas, return_exceptions=True):
+            assert isinstance(resultado, RuntimeError)
+        assert coalescer.metrics()["en_vuelo"] == 0
+
+        assert (await coalescer.run("buscar", ("rtx",), lambda: [])).value == []
+
+    asyncio.run(main())